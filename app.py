@@ -1,35 +1,255 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import requests
-from bs4 import BeautifulSoup
+from flask import Flask, Response, render_template, request, jsonify, send_file
 from urllib.parse import urljoin, urlparse
+import csv
+import io
+import logging
 import time
-import re
 import threading
 import json
 import os
+import heapq
+import itertools
+import multiprocessing
+import queue
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 import uuid
 
+from checkpoint import CrawlCheckpoint, checkpoint_path
+from dedup import make_dedup_set
+from domain_index import DomainIndex
+from enrichment import Enricher
+from events import EventBus, TERMINAL_STATUSES, format_sse
+from fetcher import Fetcher, HTTPCache
+from job_scheduler import JobScheduler, QueueFullError
+from log_setup import configure_logging, get_logger
+from page_index import PAGE_INDEX_ENABLED, PageIndex, content_hash
+from metrics import REGISTRY, CallbackMetric, JobMetrics, get_job_metrics, forget_job
+from profiler import SamplingProfiler, profile_path
+from throttle import host_throttle
+from results_store import ResultsStore, results_exist, iter_results, read_page
+from extraction import StreamingLinkExtractor, candidate_domains, extract_content_candidates, parse_page
+from url_classifier import AI_KEYWORDS, IGNORE_DOMAINS, SOURCE_DOMAINS, get_classifier, get_main_domain
+
 app = Flask(__name__)
 
+configure_logging()
+log = get_logger('app')
+
 # Globální store pro běžící úlohy
 running_jobs = {}
+# Sběrnice událostí pro /events/<job_id> (SSE)
+event_bus = EventBus()
+
+# Nastavení crawleru (lze přepsat proměnnými prostředí)
+CRAWL_MAX_WORKERS = int(os.environ.get('CRAWL_MAX_WORKERS', 8))
+MAX_SUBPAGES_PER_PAGE = 10
+# Počet procesů pro parsování stránek (0 = parsuje se přímo ve stahovacím vlákně)
+PARSE_PROCESSES = int(os.environ.get('PARSE_PROCESSES', 0))
+# Průběžné zprávy o stavu se na disk zapisují nejvýš jednou za tolik sekund (jen pro obnovu po pádu)
+STATUS_PERSIST_INTERVAL = float(os.environ.get('STATUS_PERSIST_INTERVAL', 5.0))
+SSE_KEEPALIVE = 15
+# Dávkové úlohy (/scrape/batch) - max. počet výchozích webů a hloubka procházení
+BATCH_MAX_SEEDS = int(os.environ.get('BATCH_MAX_SEEDS', 200))
+BATCH_MAX_DEPTH = 5
+# Stahování výsledků - formáty a počet záznamů v jednom bloku streamu
+DOWNLOAD_FORMATS = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8'
+}
+DOWNLOAD_CHUNK = 1000
+# Proudové zpracování - odkazy se hledají už během stahování stránky
+STREAMING_EXTRACTION = os.environ.get('STREAMING_EXTRACTION', '0') == '1'
+
+# Sdílené služby (fetcher, indexy, ověřování) se vytvoří až při prvním použití, ne při importu -
+# procesy pro parsování (forkserver) importují hlavní modul znovu a nesmí opakovat načítání indexů a cache
+services = {}
+services_lock = threading.Lock()
+
+def get_service(name, factory):
+    with services_lock:
+        if name not in services:
+            services[name] = factory()
+        return services[name]
+
+def get_fetcher():
+    """Sdílený fetcher - pool spojení a HTTP cache pro všechny úlohy"""
+    return get_service('fetcher', lambda: Fetcher(cache=HTTPCache()))
+
+def get_domain_index():
+    """Globální index domén - deduplikace a historie nálezů napříč všemi úlohami"""
+    return get_service('domain_index', DomainIndex)
+
+def get_page_index():
+    """Index navštívených stránek - otisky těl a extrakce pro opakované crawly (None = vypnutý)"""
+    return get_service('page_index', PageIndex) if PAGE_INDEX_ENABLED else None
+
+def get_enricher():
+    """Ověření nalezených domén (dostupnost, titulek, popis) s cache sdílenou všemi úlohami"""
+    return get_service('enricher', Enricher)
+
+# Sdílený pool procesů pro parsování - vytvoří se až při prvním použití
+parse_pool = None
+parse_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Vrátí sdílený ProcessPoolExecutor pro parsování, nebo None když je vypnutý"""
+    global parse_pool
+    if PARSE_PROCESSES <= 0:
+        return None
+    with parse_pool_lock:
+        if parse_pool is None:
+            # Fork z vícevláknového procesu může zdědit zamčené zámky (SQLite, logování) - procesy se
+            # proto startují přes forkserver; ten znovu importuje hlavní modul, sdílené služby jsou proto líné
+            parse_pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES, mp_context=multiprocessing.get_context('forkserver'))
+        return parse_pool
+
+class StreamedPage:
+    """Rozpracovaná stránka v proudovém režimu - nálezy a podstránky z dosud přečtených částí"""
+    def __init__(self, url, current_depth, seed=0):
+        self.url = url
+        self.netloc = urlparse(url).netloc
+        self.current_depth = current_depth
+        self.seed = seed
+        self.found_urls = []
+        self.local_found_domains = set()
+        self.subpages_to_visit = []
+        self.seen_subpages = set()
+        self.links_processed = 0
+        # Test mód sbírá nálezy celé stránky a vyhodnotí je až na konci (process_page)
+        self.content_domains = []
+        self.tool_domains = []
+
+    def add_subpage(self, full_url):
+        if urlparse(full_url).netloc == self.netloc and full_url != self.url and full_url not in self.seen_subpages:
+            self.seen_subpages.add(full_url)
+            self.subpages_to_visit.append(full_url)
+
+class SeedFrontier:
+    """Fronta stránek rozdělená podle seedů - bere se střídavě, aby jeden velký web neblokoval ostatní
+
+    V rámci seedu jdou stránky po hloubkách, ve stejné hloubce dřív ty s vyšší prioritou
+    (často se měnící stránky), při shodě v pořadí zařazení.
+    """
+    def __init__(self, seed_count):
+        self.queues = [[] for _ in range(seed_count)]
+        self.sequence = itertools.count()
+        self.turn = 0
+        self.size = 0
+
+    def append(self, url, depth, seed, priority=0.0):
+        heapq.heappush(self.queues[seed], (depth, -priority, next(self.sequence), url))
+        self.size += 1
+
+    def popleft(self):
+        """Vrátí (url, hloubka, seed) z dalšího seedu v pořadí, který má něco ve frontě"""
+        for _ in range(len(self.queues)):
+            seed = self.turn
+            self.turn = (self.turn + 1) % len(self.queues)
+            if self.queues[seed]:
+                self.size -= 1
+                depth, _, _, url = heapq.heappop(self.queues[seed])
+                return url, depth, seed
+        raise IndexError("fronta je prázdná")
+
+    def pending(self, seed):
+        return len(self.queues[seed])
+
+    def clear(self):
+        for queue_ in self.queues:
+            queue_.clear()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+def make_seed(url, max_depth=2, test_mode=False):
+    """Výchozí web úlohy s vlastní hloubkou procházení a test módem"""
+    return {'url': url, 'max_depth': max_depth, 'test_mode': test_mode}
+
+def parse_seeds(items, defaults):
+    """Seedy z požadavku /scrape/batch - URL nebo objekty {url, max_depth, test_mode}"""
+    if not isinstance(items, list) or not items:
+        raise ValueError('Seznam seeds je prázdný')
+    if len(items) > BATCH_MAX_SEEDS:
+        raise ValueError(f'Příliš mnoho seedů (max {BATCH_MAX_SEEDS})')
+    seeds = []
+    seen = set()
+    for item in items:
+        if isinstance(item, str):
+            item = {'url': item}
+        if not isinstance(item, dict) or not item.get('url'):
+            raise ValueError('Každý seed musí mít URL')
+        if item['url'] in seen:
+            continue
+        seen.add(item['url'])
+        max_depth = int(item.get('max_depth', defaults.get('max_depth', 2)))
+        seeds.append(make_seed(item['url'], min(max(max_depth, 0), BATCH_MAX_DEPTH),
+                               bool(item.get('test_mode', defaults.get('test_mode', False)))))
+    return seeds
+
+def parse_job_options(data):
+    """max_age a priorita z těla požadavku - neplatná hodnota vyhodí ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError('Tělo požadavku musí být JSON objekt')
+    try:
+        max_age = float(data['max_age']) if data.get('max_age') is not None else None
+        priority = int(data.get('priority') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('Neplatná hodnota max_age nebo priority')
+    return max_age, priority
 
 class AIScraper:
-    def __init__(self, job_id):
+    def __init__(self, job_id, streaming=STREAMING_EXTRACTION, incremental=False, profile=False, enrich=False, max_age=None):
         self.job_id = job_id
-        # Unikátní množina pro ukládání hlavních domén
-        self.unique_domains = set()
+        self.log = get_logger('job', job_id)
+        # Časy fází (stahování, regexy, parsování, klasifikace, ukládání) pro /metrics
+        self.metrics = JobMetrics(job_id)
+        # Vzorkovací profiler vláken úlohy - výsledek v {job_id}_profile.folded
+        self.profile = profile
+        self.fetcher = get_fetcher()
+        self.domain_index = get_domain_index()
+        # Opakovaný crawl převezme extrakci nezměněných stránek, stránky mladší než max_age hodin ani nestahuje
+        self.page_index = get_page_index()
+        self.max_age = max_age
+        self.streaming = streaming
+        # Inkrementální běh ukládá jen domény, které žádná předchozí úloha nenašla
+        self.incremental = incremental
+        # Po crawlu se ověří dostupnost a metadata nalezených domén
+        self.enrich = enrich
+        # Zámek pro sdílený stav, když stránky zpracovávají worker vlákna (proudový režim)
+        self.lock = threading.RLock()
+        # Nastaví se při zrušení úlohy - crawler přestane brát další stránky
+        self.cancel_event = threading.Event()
+        # Sloučený zápis stavu na disk
+        self.pending_status = None
+        self.persisted_status = None
+        self.last_persist = 0.0
+        self.flush_timer = None
+        # Unikátní množina hlavních domén - kompaktní otisky místo řetězců (DEDUP_MODE)
+        self.unique_domains = make_dedup_set()
+        # Domény, které inkrementální běh neuložil, protože je našla už dřívější úloha
+        self.known_domains = make_dedup_set()
+        # Výchozí weby úlohy a průběh po jednotlivých seedech (dávková úloha jich má víc)
+        self.seeds = []
+        self.seed_progress = []
+        self.batch = False
         # AI související klíčová slova pro lepší detekci
-        self.ai_keywords = ['ai', 'artificial', 'intelligence', 'tool', 'gpt', 'chat', 'bot', 'machine', 'learning', 'neural', 'openai', 'claude', 'gemini', 'copilot', 'assistant', 'generator', 'automation', 'smart', 'auto']
+        self.ai_keywords = list(AI_KEYWORDS)
         # Seznam domén k ignorování (sociální sítě, běžné weby)
-        self.ignore_domains = ['facebook.com', 'twitter.com', 'linkedin.com', 'youtube.com', 'google.com', 'github.com']
+        self.ignore_domains = list(IGNORE_DOMAINS)
+        # Předkompilovaná pravidla klasifikace (sdílená mezi úlohami se stejnými pravidly)
+        self.classifier_rules = (tuple(self.ai_keywords), tuple(self.ignore_domains + SOURCE_DOMAINS))
+        self.classifier = get_classifier(*self.classifier_rules)
         
         # Nastavení pro ukládání výsledků
         self.results_dir = "results"
         if not os.path.exists(self.results_dir):
             os.makedirs(self.results_dir)
-        self.results_file = os.path.join(self.results_dir, f"{job_id}_results.json")
+        self.results_store = ResultsStore(job_id, self.results_dir)
+        self.checkpoint = CrawlCheckpoint(job_id, self.results_dir)
         self.status_file = os.path.join(self.results_dir, f"{job_id}_status.json")
         
         # Načti existující výsledky do unique_domains pro prevenci duplicit
@@ -39,282 +259,592 @@ class AIScraper:
         self.update_status("starting", "Inicializace scraperu...")
         
     def load_existing_results(self):
-        """Načte existující výsledky pro prevenci duplicit"""
-        if os.path.exists(self.results_file):
-            try:
-                with open(self.results_file, 'r', encoding='utf-8') as f:
-                    existing_results = json.load(f)
-                    for result in existing_results:
-                        if result.get('url'):
-                            self.unique_domains.add(result['url'])
-                print(f"🔄 Načteno {len(self.unique_domains)} existujících URL pro prevenci duplicit")
-            except Exception as e:
-                print(f"⚠️  Nepodařilo se načíst existující výsledky: {e}")
+        """Načte existující výsledky pro prevenci duplicit (i po pádu uprostřed zápisu)"""
+        try:
+            if self.results_store.recover(seen=self.unique_domains):
+                self.log.info("🔄 Načteno %d existujících URL pro prevenci duplicit", len(self.unique_domains))
+        except Exception as e:
+            self.log.warning("⚠️  Nepodařilo se načíst existující výsledky: %s", e)
                 
     def update_status(self, status, message, found_count=0):
-        """Aktualizuje stav úlohy"""
+        """Aktualizuje stav úlohy - odběratelům hned, na disk sloučeně"""
+        # Po zrušení už rozpracované stránky stav nepřepíšou zpět na running
+        if self.cancel_event.is_set() and status not in ("completed", "cancelled", "error"):
+            return
         status_data = {
-            "status": status,  # starting, running, completed, error
+            "status": status,  # starting, queued, running, completed, cancelled, error
             "message": message,
             "found_count": found_count,
             "timestamp": datetime.now().isoformat(),
             "job_id": self.job_id
         }
         
-        with open(self.status_file, 'w', encoding='utf-8') as f:
+        with self.lock:
+            if self.batch:
+                status_data["seeds"] = [dict(progress) for progress in self.seed_progress]
+            # Také aktualizuj globální store a pošli stav odběratelům
+            running_jobs[self.job_id] = status_data
+            event_bus.publish(self.job_id, 'status', status_data)
+            
+            # Změna stavu se zapíše hned, průběžné zprávy nejvýš jednou za interval
+            self.pending_status = status_data
+            if status != self.persisted_status or time.monotonic() - self.last_persist >= STATUS_PERSIST_INTERVAL:
+                self.persist_status()
+            elif self.flush_timer is None:
+                self.flush_timer = threading.Timer(STATUS_PERSIST_INTERVAL, self.flush_status)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+        
+    def persist_status(self):
+        """Atomicky zapíše poslední stav do souboru (volá se se zámkem)"""
+        status_data = self.pending_status
+        tmp_file = f"{self.status_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(status_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.status_file)
+        self.pending_status = None
+        self.persisted_status = status_data['status']
+        self.last_persist = time.monotonic()
         
-        # Také aktualizuj globální store
-        running_jobs[self.job_id] = status_data
+    def flush_status(self):
+        """Zapíše odložený stav, pokud od posledního zápisu přišla novější zpráva"""
+        with self.lock:
+            self.flush_timer = None
+            if self.pending_status is not None:
+                self.persist_status()
         
-    def save_batch(self, new_urls):
-        """Uloží novou dávku URL do souboru s důslednou kontrolou duplicit"""
+    def cancel(self):
+        """Zruší úlohu - čekající se nespustí, běžící dokončí rozpracované stránky a skončí"""
+        self.cancel_event.set()
+        self.update_status("cancelled", "Úloha zrušena uživatelem", len(self.unique_domains))
+        
+    def save_batch(self, new_urls, seed=None):
+        """Připíše novou dávku URL do logu výsledků, duplicity hlídá množina v paměti
+
+        seed je index výchozího webu - u dávkové úlohy se uloží k výsledkům jako původ.
+        """
         if not new_urls:
             return
+        
+        with self.metrics.timer('persist'):
+            # Stejná doména chodí do save_batch opakovaně (průběžné i finální ukládání) - do indexu
+            # se zapíše jen poprvé, domény známé z dřívějších úloh se v inkrementálním běhu pamatují zvlášť
+            unrecorded = [url for url in new_urls if url not in self.results_store.urls and url not in self.known_domains]
+            # Zapiš nálezy do globálního indexu (první/poslední výskyt, zdrojové úlohy)
+            globally_new = self.domain_index.record(unrecorded, self.job_id)
+            already_known = []
+            if self.incremental:
+                globally_new = set(globally_new)
+                already_known = [url for url in unrecorded if url not in globally_new]
+                for url in already_known:
+                    self.known_domains.add(url)
             
-        # Načti existující výsledky
-        all_results = []
-        existing_urls = set()  # Množina pro rychlou kontrolu duplicit
+            saved = self.results_store.append([url for url in unrecorded if url not in already_known],
+                                              self.seeds[seed]['url'] if self.batch and seed is not None else None)
         
-        if os.path.exists(self.results_file):
-            try:
-                with open(self.results_file, 'r', encoding='utf-8') as f:
-                    all_results = json.load(f)
-                    # Vytvoř množinu existujících URL pro rychlou kontrolu
-                    existing_urls = {r.get('url') for r in all_results if r.get('url')}
-            except:
-                all_results = []
-                existing_urls = set()
-        
-        # Počítadlo skutečně nových URL
-        actually_new = 0
-        
-        # Přidej pouze skutečně nové URL
-        for url in new_urls:
-            if url not in existing_urls:
-                all_results.append({
-                    "url": url,
-                    "found_at": datetime.now().isoformat()
-                })
-                existing_urls.add(url)  # Přidej do množiny pro další kontroly
-                actually_new += 1
-                print(f"  ➕ Nové: {url}")
-            else:
-                print(f"  ⚠️  Duplikát ignorován: {url}")
+        # Výpis po jednotlivých URL jen na úrovni DEBUG, jinak se smyčky vůbec neprochází
+        if self.log.isEnabledFor(logging.DEBUG):
+            if self.incremental:
+                for url in already_known:
+                    self.log.debug("  ⏭️  Známá z dřívějších úloh: %s", url)
+            saved_set = set(saved)
+            for url in new_urls:
+                if url in saved_set:
+                    self.log.debug("  ➕ Nové: %s", url)
+                else:
+                    self.log.debug("  ⚠️  Duplikát ignorován: %s", url)
         
-        # Ulož zpět jen pokud jsou skutečně nová data
-        if actually_new > 0:
-            with open(self.results_file, 'w', encoding='utf-8') as f:
-                json.dump(all_results, f, ensure_ascii=False, indent=2)
-            print(f"✅ Uloženo {actually_new} nových URL. Celkem: {len(all_results)}")
+        if saved:
+            self.metrics.add_saved(len(saved))
+            if seed is not None and self.seed_progress:
+                with self.lock:
+                    self.seed_progress[seed]['found'] += len(saved)
+            event_bus.publish(self.job_id, 'urls', {'urls': saved, 'total': self.results_store.count})
+            self.log.debug("✅ Uloženo %d nových URL. Celkem: %d", len(saved), self.results_store.count)
         else:
-            print(f"ℹ️  Žádné nové URL k uložení - všechny byly duplikáty")
+            self.log.debug("ℹ️  Žádné nové URL k uložení - všechny byly duplikáty")
         
     def is_ai_tool_domain(self, url):
         """Zjistí, zda je URL AI nástroj podle domény a kontextu"""
-        try:
-            domain = urlparse(url).netloc.lower()
-            
-            # Odstraň www. prefix
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            # Ignoruj známé ne-AI domény a původní stránku
-            ignore_domains = self.ignore_domains + ['futurepedia.io', 'theresanaiforthat.com', 'futuretools.io', 'producthunt.com']
-            for ignore in ignore_domains:
-                if ignore in domain:
-                    return False
-            
-            # Rozšířený seznam prioritních koncovek
-            ai_extensions = ['.ai', '.io', '.app', '.tech', '.co']
-            for ext in ai_extensions:
-                if domain.endswith(ext):
-                    return True
-            
-            # Pro .com, .org, .net domény - kontrola AI klíčových slov
-            common_extensions = ['.com', '.org', '.net', '.dev', '.cc', '.me', '.ly']
-            for ext in common_extensions:
-                if domain.endswith(ext):
-                    for keyword in self.ai_keywords:
-                        if keyword in domain:
-                            return True
-            
-            # Pokud má URL suggestivní path (např. obsahuje "tool", "ai")
-            path = urlparse(url).path.lower()
-            ai_path_keywords = ['tool', 'ai', 'gpt', 'chat', 'bot', 'generate', 'create']
-            for keyword in ai_path_keywords:
-                if keyword in path:
-                    return True
-            
-            return False
-            
-        except Exception:
-            return False
+        return self.classifier.is_ai_tool(url)
     
     def get_main_domain(self, url):
         """Vrátí hlavní doménu z URL"""
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            return f"https://{domain}"
-        except Exception:
-            return None
+        return get_main_domain(url)
+
+    def claim_new_domains(self, domains):
+        """Zaregistruje domény, které ještě nebyly nalezeny, a vrátí je"""
+        new_domains = []
+        for domain in domains:
+            if self.unique_domains.add(domain):
+                new_domains.append(domain)
+        return new_domains
 
     def extract_all_links_from_content(self, content, base_url):
         """Extrahuje všechny možné odkazy z obsahu stránky s důslednou kontrolou duplicit"""
-        found_urls = []
-        local_found_domains = set()  # Lokální kontrola duplicit pro tuto stránku
-        
-        # 1. Zkus najít URL v JSON datech
-        json_patterns = [
-            r'"websiteUrl":"(https?://[^"?]+)',
-            r'"url":"(https?://[^"?]+)',
-            r'"link":"(https?://[^"?]+)',
-            r'"href":"(https?://[^"?]+)'
-        ]
-        
-        for pattern in json_patterns:
-            matches = re.findall(pattern, content)
-            for url in matches:
-                if self.is_ai_tool_domain(url):
-                    main_domain = self.get_main_domain(url)
-                    if main_domain and main_domain not in self.unique_domains and main_domain not in local_found_domains:
-                        self.unique_domains.add(main_domain)
-                        local_found_domains.add(main_domain)
-                        found_urls.append(main_domain)
-                        print(f"DEBUG: JSON AI nástroj: {main_domain}")
-                    elif main_domain in self.unique_domains:
-                        print(f"DEBUG: JSON duplikát ignorován: {main_domain}")
-        
-        # 2. Hledej URL v textu (např. api.domain.com v skriptech)
-        url_pattern = r'https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:/[^\s"\'<>]*)?'
-        text_urls = re.findall(url_pattern, content)
-        
-        for url in text_urls:
-            if self.is_ai_tool_domain(url):
-                main_domain = self.get_main_domain(url)
-                if main_domain and main_domain not in self.unique_domains and main_domain not in local_found_domains:
-                    self.unique_domains.add(main_domain)
-                    local_found_domains.add(main_domain)
-                    found_urls.append(main_domain)
-                    print(f"DEBUG: TEXT AI nástroj: {main_domain}")
-                elif main_domain in self.unique_domains:
-                    print(f"DEBUG: TEXT duplikát ignorován: {main_domain}")
+        # JSON data + URL v textu (např. api.domain.com v skriptech)
+        candidates = extract_content_candidates(content, self.classifier)
+        found_urls = self.claim_new_domains(candidates)
         
-        print(f"DEBUG: Celkem nalezeno {len(found_urls)} NOVÝCH AI nástrojů z obsahu (ignorováno {len(local_found_domains) - len(found_urls)} duplikátů)")
+        self.log.debug("Celkem nalezeno %d NOVÝCH AI nástrojů z obsahu (ignorováno %d duplikátů)",
+                       len(found_urls), len(candidates) - len(found_urls))
         return found_urls
 
-    def scrape_page(self, url, max_depth=2, current_depth=0, test_mode=False):
-        """Projde stránku a najde AI nástroje s asynchronním ukládáním"""
-        print(f"Scrapuji: {url} (hloubka: {current_depth})")
-        
-        try:
-            # Aktualizuj stav
-            self.update_status("running", f"Scrapuji: {url} (hloubka: {current_depth})", len(self.unique_domains))
-            
-            # Získá obsah stránky
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            content = response.text
+    def fetch_page(self, url):
+        """Stáhne stránku v limitech hostitele, přechodné chyby zopakuje (běží ve worker vlákně)"""
+        def fetch():
+            with self.metrics.timer('fetch'):
+                return self.fetcher.fetch(url)
+        return host_throttle.call(url, fetch, self.cancel_event, self.metrics.observe)
+
+    def parse_options(self, current_depth, max_depth, test_mode):
+        """Parametry parse_page kromě samotné stránky - jen jednoduchá data, aby šla poslat do jiného procesu"""
+        return (current_depth < max_depth and not test_mode,  # V test módu neprocházej podstránky
+                50 if test_mode else None,  # V test módu omezí zpracování na prvních 50 odkazů
+                self.classifier_rules)
+
+    def fetch_known(self, url, options):
+        """Stáhne stránku, pokud ji nejde převzít z indexu stránek (worker vlákno)
+
+        Vrací (stránka, otisk těla, extrakce) - extrakce je None, když se stránka musí rozparsovat.
+        """
+        if self.page_index is None:
+            return self.fetch_page(url), None, None
+        variant = self.page_index.variant(options)
+        if self.max_age is not None:
+            parsed = self.page_index.fresh(url, variant, self.max_age)
+            if parsed is not None:
+                self.log.debug("Stránka %s je čerstvá, nestahuje se", url)
+                return None, None, parsed
+        page = self.fetch_page(url)
+        page_hash = content_hash(page.content)
+        return page, page_hash, self.page_index.unchanged(url, page_hash, variant)
+
+    def record_page(self, url, page_hash, options, parsed):
+        """Uloží extrakci stažené stránky do indexu stránek"""
+        if self.page_index is not None and page_hash is not None:
+            self.page_index.record(url, page_hash, self.page_index.variant(options), parsed)
+
+    def fetch_and_parse(self, url, current_depth, max_depth, test_mode):
+        """Stáhne a rovnou rozparsuje stránku ve worker vlákně (bez poolu procesů)"""
+        options = self.parse_options(current_depth, max_depth, test_mode)
+        page, page_hash, parsed = self.fetch_known(url, options)
+        if parsed is None:
+            parsed = parse_page(page.content, page.encoding, url, *options)
+        self.record_page(url, page_hash, options, parsed)
+        return parsed
+
+    def test_mode_done(self, message):
+        """Test mód našel dost nástrojů - dávková úloha ale běží dál s ostatními seedy"""
+        self.update_status("running" if self.batch else "completed", message, len(self.unique_domains))
+
+    def process_page(self, url, parsed, current_depth=0, max_depth=2, test_mode=False, seed=None):
+        """Zpracuje rozparsovanou stránku - vrátí nalezené AI nástroje a podstránky k návštěvě"""
+        content_domains, tool_domains, subpages, timings = parsed
+        self.metrics.observe_many(timings)
+        # Proudové workery mění stejné množiny domén a log výsledků souběžně - stav se mění jen pod zámkem
+        with self.lock:
             found_urls = []
-            
-            # Nejdříve zkusí extrahovat z obsahu stránky (JSON + text)
-            content_urls = self.extract_all_links_from_content(content, url)
+        
+            # Nejdříve AI nástroje z obsahu stránky (JSON + text)
+            content_urls = self.claim_new_domains(content_domains)
             found_urls.extend(content_urls)
-            
+        
             # ULOŽENÍ DÁVKY PRŮBĚŽNĚ (každých 10+ URL)
             if len(content_urls) > 0:
-                self.save_batch(content_urls)
+                self.save_batch(content_urls, seed)
                 self.update_status("running", f"Nalezeno {len(content_urls)} AI nástrojů na {url}", len(self.unique_domains))
-            
+        
             # Pokud v test módu najde dost URL z obsahu, zastav
             if test_mode and len(found_urls) >= 10:
-                self.update_status("completed", f"TEST MÓD: Nalezeno {len(found_urls)} AI nástrojů", len(self.unique_domains))
-                return found_urls[:10]
-            
-            # Pokud nenajde dost v JSON nebo není test mód, pokračuj běžným scrapingem
-            soup = BeautifulSoup(content, 'html5lib')
-            links = soup.find_all('a', href=True)
-            subpages_to_visit = []
+                self.test_mode_done(f"TEST MÓD: Nalezeno {len(found_urls)} AI nástrojů")
+                return found_urls[:10], []
+        
+            # AI nástroje z odkazů <a href>
+            for main_domain in tool_domains:
+                if self.unique_domains.add(main_domain):
+                    found_urls.append(main_domain)
+                    self.log.debug("Nalezen AI nástroj: %s", main_domain)
+                
+                    # PRŮBĚŽNÉ UKLÁDÁNÍ po každých 5 nálezech
+                    if len(found_urls) % 5 == 0:
+                        self.save_batch([main_domain], seed)
+                    
+                    # V test módu zastav po nalezení 10 nástrojů
+                    if test_mode and len(found_urls) >= 10:
+                        self.test_mode_done("TEST MÓD: Nalezeno 10 AI nástrojů")
+                        self.save_batch(found_urls[-5:], seed)  # ulož posledních 5
+                        return found_urls[:10], []
+        
+            # Ulož dávku za celou stránku
+            if found_urls:
+                self.save_batch(found_urls, seed)
+        
+            return found_urls, subpages[:MAX_SUBPAGES_PER_PAGE]  # Omezí na 10 podstránek pro rychlost
+
+    def stream_page(self, url, current_depth=0, max_depth=2, test_mode=False, seed=None):
+        """Stáhne a zpracuje stránku proudově - nálezy se ukládají už během stahování (worker vlákno)
+
+        Při přechodné chybě se stránka zpracuje znovu celá, už uložené nálezy odfiltruje deduplikace.
+        """
+        return host_throttle.call(url, lambda: self.stream_page_once(url, current_depth, max_depth, test_mode, seed),
+                                  self.cancel_event, self.metrics.observe)
+
+    def stream_page_once(self, url, current_depth, max_depth, test_mode, seed):
+        """Jeden pokus o proudové stažení a zpracování stránky"""
+        page = StreamedPage(url, current_depth, seed)
+        extractor = StreamingLinkExtractor()
+        # Čekání na další kus odpovědi se počítá jako stahování
+        fetch_seconds = 0.0
+        try:
+            chunks = self.fetcher.iter_text(url)
+            try:
+                mark = time.perf_counter()
+                for chunk in chunks:
+                    fetch_seconds += time.perf_counter() - mark
+                    if self.cancel_event.is_set():
+                        return page.found_urls, []
+                    if test_mode:
+                        self.collect_test_part(page, *extractor.feed(chunk))
+                    else:
+                        self.handle_stream_part(page, *extractor.feed(chunk), max_depth)
+                    mark = time.perf_counter()
+            finally:
+                chunks.close()
+            if test_mode:
+                # Limit 10 nálezů se uplatní až na celou stránku jako u neproudové extrakce -
+                # uložené domény tak nezávisí na tom, jak se odpověď rozdělila na kusy
+                self.collect_test_part(page, *extractor.close())
+                return self.process_page(url, (page.content_domains, page.tool_domains, [], {}), current_depth, max_depth, test_mode, seed)
+            self.handle_stream_part(page, *extractor.close(), max_depth)
+            return page.found_urls, page.subpages_to_visit[:MAX_SUBPAGES_PER_PAGE]
+        finally:
+            self.metrics.observe('fetch', fetch_seconds)
+            self.metrics.observe_many(extractor.timings)
+
+    def collect_test_part(self, page, content_urls, hrefs):
+        """Test mód - jen posbírá kandidáty z kusu proudu, ukládají se až za celou stránku"""
+        # V test módu zpracuj jen prvních 50 odkazů
+        hrefs = hrefs[:max(0, 50 - page.links_processed)]
+        page.links_processed += len(hrefs)
+        started = time.perf_counter()
+        link_urls = [urljoin(page.url, href) for href in hrefs]
+        page.content_domains.extend(candidate_domains(content_urls, self.classifier, page.local_found_domains))
+        for full_url, is_ai_tool in zip(link_urls, self.classifier.classify_many(link_urls)):
+            main_domain = self.get_main_domain(full_url) if is_ai_tool else None
+            if main_domain and main_domain not in page.tool_domains:
+                page.tool_domains.append(main_domain)
+        self.metrics.observe('classify', time.perf_counter() - started)
+
+    def handle_stream_part(self, page, content_urls, hrefs, max_depth):
+        """Zpracuje jeden kus proudu"""
+        started = time.perf_counter()
+        link_urls = [urljoin(page.url, href) for href in hrefs]
+        link_flags = self.classifier.classify_many(link_urls)
+        content_domains = candidate_domains(content_urls, self.classifier, page.local_found_domains)
+        self.metrics.observe('classify', time.perf_counter() - started)
+        
+        with self.lock:
+            new_urls = self.claim_new_domains(content_domains)
             
-            # V test módu omezí zpracování na prvních 50 odkazů
-            links_to_process = links[:50] if test_mode else links
+            for full_url, is_ai_tool in zip(link_urls, link_flags):
+                if is_ai_tool:
+                    main_domain = self.get_main_domain(full_url)
+                    if main_domain and self.unique_domains.add(main_domain):
+                        new_urls.append(main_domain)
+                        self.log.debug("Nalezen AI nástroj: %s", main_domain)
+                # Shromáždí podstránky k prozkoumání (pouze ze stejné domény)
+                elif page.current_depth < max_depth:
+                    page.add_subpage(full_url)
             
-            for link in links_to_process:
-                href = link['href']
+            page.found_urls.extend(new_urls)
+            if new_urls:
+                self.save_batch(new_urls, page.seed)
+                self.update_status("running", f"Nalezeno {len(page.found_urls)} AI nástrojů na {page.url}", len(self.unique_domains))
+
+    def scrape_page(self, start_url, max_depth=2, test_mode=False, resume_state=None):
+        """Projde web od zadané stránky - fronta (url, hloubka), souběžné stahování a parsování"""
+        return self.crawl([make_seed(start_url, max_depth, test_mode)], resume_state)
+
+    def start_seeds(self, seeds):
+        with self.lock:
+            self.seeds = seeds
+            self.seed_progress = [
+                {'url': seed['url'], 'pages_done': 0, 'pages_pending': 0, 'page_errors': 0, 'found': 0, 'done': False}
+                for seed in seeds
+            ]
+
+    def update_seed(self, seed, frontier, in_flight_pages, page_error=False):
+        """Průběh jednoho seedu po dokončení jeho stránky"""
+        with self.lock:
+            progress = self.seed_progress[seed]
+            progress['pages_done'] += 1
+            if page_error:
+                progress['page_errors'] += 1
+            progress['pages_pending'] = frontier.pending(seed) + in_flight_pages[seed]
+            progress['done'] = progress['pages_pending'] == 0
+
+    def crawl(self, seeds, resume_state=None):
+        """Projde všechny seedy společnou frontou - sdílené stahování, parsování a deduplikace
+
+        Stránky se z fronty berou střídavě po seedech, každý seed má vlastní hloubku a test mód.
+        """
+        found_urls = []
+        frontier = SeedFrontier(len(seeds))
+        visited = make_dedup_set()
+        if resume_state is not None:
+            # Pokračuj z checkpointu - jen nedokončené stránky, navštívené se znovu nezařadí
+            for url, depth, seed in resume_state.pending:
+                frontier.append(url, depth, seed)
+            visited.update(resume_state.enqueued)
+        else:
+            for seed, seed_info in enumerate(seeds):
+                if visited.add(seed_info['url']):
+                    frontier.append(seed_info['url'], 0, seed)
+        # Rozpracované stránky po seedech - seed je hotový, když nemá nic ve frontě ani rozpracované
+        in_flight_pages = [0] * len(seeds)
+        # future -> (url, hloubka, seed, fáze, začátek, otisk těla)
+        # fáze "fetch" a "stream" (proudové zpracování) běží ve vlákně, "parse" v poolu procesů
+        in_flight = {}
+        fetching = 0
+        pool = None if self.streaming else get_parse_pool()
+        
+        with ThreadPoolExecutor(max_workers=CRAWL_MAX_WORKERS, thread_name_prefix=f"crawl-{self.job_id}") as executor:
+            while frontier or in_flight:
+                # Zrušená úloha už nové stránky nebere, jen dokončí rozpracované
+                if self.cancel_event.is_set():
+                    frontier.clear()
+                    if not in_flight:
+                        break
                 
-                # Převede relativní odkazy na absolutní
-                full_url = urljoin(url, href)
+                # Doplň rozpracované požadavky až do limitu souběžnosti
+                while frontier and fetching < CRAWL_MAX_WORKERS:
+                    url, depth, seed = frontier.popleft()
+                    max_depth, test_mode = seeds[seed]['max_depth'], seeds[seed]['test_mode']
+                    self.log.info("Scrapuji: %s (hloubka: %d)", url, depth)
+                    self.update_status("running", f"Scrapuji: {url} (hloubka: {depth})", len(self.unique_domains))
+                    stage = "fetch"
+                    if self.streaming:
+                        future = executor.submit(self.stream_page, url, depth, max_depth, test_mode, seed)
+                        stage = "stream"
+                    elif pool:
+                        future = executor.submit(self.fetch_known, url, self.parse_options(depth, max_depth, test_mode))
+                    else:
+                        future = executor.submit(self.fetch_and_parse, url, depth, max_depth, test_mode)
+                    in_flight[future] = (url, depth, seed, stage, time.perf_counter(), None)
+                    in_flight_pages[seed] += 1
+                    fetching += 1
                 
-                # Kontrola, zda je to AI nástroj
-                if self.is_ai_tool_domain(full_url):
-                    main_domain = self.get_main_domain(full_url)
-                    if main_domain and main_domain not in self.unique_domains:
-                        self.unique_domains.add(main_domain)
-                        found_urls.append(main_domain)
-                        print(f"Nalezen AI nástroj: {main_domain}")
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth, seed, stage, started, page_hash = in_flight.pop(future)
+                    max_depth, test_mode = seeds[seed]['max_depth'], seeds[seed]['test_mode']
+                    if stage != "parse":
+                        fetching -= 1
+                    try:
+                        # Stažené tělo pošli k parsování do poolu procesů (pokud extrakce není v indexu stránek)
+                        if stage == "fetch" and pool:
+                            page, page_hash, parsed = future.result()
+                            if parsed is None:
+                                in_flight[pool.submit(parse_page, page.content, page.encoding, url, *self.parse_options(depth, max_depth, test_mode))] = \
+                                    (url, depth, seed, "parse", started, page_hash)
+                                continue
+                            self.record_page(url, page_hash, self.parse_options(depth, max_depth, test_mode), parsed)
+                        else:
+                            parsed = future.result()
+                            if stage == "parse":
+                                self.record_page(url, page_hash, self.parse_options(depth, max_depth, test_mode), parsed)
                         
-                        # PRŮBĚŽNÉ UKLÁDÁNÍ po každých 5 nálezech
-                        if len(found_urls) % 5 == 0:
-                            self.save_batch([main_domain])
-                            
-                        # V test módu zastav po nalezení 10 nástrojů
-                        if test_mode and len(found_urls) >= 10:
-                            self.update_status("completed", "TEST MÓD: Nalezeno 10 AI nástrojů", len(self.unique_domains))
-                            self.save_batch(found_urls[-5:])  # ulož posledních 5
-                            return found_urls[:10]
-                
-                # Shromáždí podstránky k prozkoumání (pouze ze stejné domény)
-                elif current_depth < max_depth and not test_mode:  # V test módu neprocházej podstránky
-                    if urlparse(full_url).netloc == urlparse(url).netloc:
-                        if full_url not in subpages_to_visit and full_url != url:
-                            subpages_to_visit.append(full_url)
-            
-            # Rekurzivně projde podstránky (pokud není test mód)
-            if current_depth < max_depth and not test_mode:
-                for subpage in subpages_to_visit[:10]:  # Omezí na 10 podstránek pro rychlost
-                    time.sleep(1)  # Pause mezi požadavky
-                    sub_results = self.scrape_page(subpage, max_depth, current_depth + 1, test_mode)
-                    found_urls.extend(sub_results)
+                        if stage == "stream":
+                            page_urls, subpages = parsed
+                        else:
+                            page_urls, subpages = self.process_page(url, parsed, depth, max_depth, test_mode, seed)
+                    except Exception as e:
+                        error_msg = f"Chyba při scrapování {url}: {str(e)}"
+                        self.log.warning(error_msg)
+                        self.metrics.page_done(time.perf_counter() - started, error=True)
+                        in_flight_pages[seed] -= 1
+                        self.update_seed(seed, frontier, in_flight_pages, page_error=True)
+                        # Chyba jedné stránky úlohu neukončí - jen se započítá do průběhu seedu
+                        self.update_status("running", f"⚠️ {error_msg}", len(self.unique_domains))
+                        continue
                     
-                    # Ulož dávku po každé podstránce
-                    if sub_results:
-                        self.save_batch(sub_results)
-            
-            return found_urls
-            
-        except Exception as e:
-            error_msg = f"Chyba při scrapování {url}: {str(e)}"
-            print(error_msg)
-            self.update_status("error", error_msg, len(self.unique_domains))
-            return []
+                    found_urls.extend(page_urls)
+                    new_subpages = [subpage for subpage in subpages if visited.add(subpage)]
+                    # Často se měnící stránky mají ve frontě přednost
+                    priorities = self.page_index.change_rates(new_subpages) if self.page_index is not None and new_subpages else {}
+                    for subpage in new_subpages:
+                        frontier.append(subpage, depth + 1, seed, priorities.get(subpage, 0.0))
+                    # Stránka je hotová - výsledky jsou uložené, podstránky ve frontě
+                    with self.metrics.timer('persist'):
+                        self.checkpoint.page_done(url, new_subpages, depth + 1, seed)
+                    self.metrics.page_done(time.perf_counter() - started)
+                    in_flight_pages[seed] -= 1
+                    self.update_seed(seed, frontier, in_flight_pages)
+        
+        return found_urls
 
-    def run_scraping_job(self, start_url, test_mode=False):
-        """Spustí hlavní scraping úlohu"""
+    def run_scraping_job(self, start_url=None, test_mode=False, resume=False, seeds=None):
+        """Spustí hlavní scraping úlohu (resume=True pokračuje z uloženého checkpointu)
+
+        Dávková úloha místo start_url dostane seznam seedů (viz make_seed).
+        """
+        profiler = None
         try:
-            self.update_status("running", f"Spouštím scraping {'v TEST módu' if test_mode else 'v PLNÉM módu'}...")
+            if self.cancel_event.is_set():
+                return []
+            
+            if self.profile:
+                profiler = SamplingProfiler(thread_prefixes=(f"crawl-{self.job_id}",))
+                profiler.add_thread()
+                profiler.start()
             
-            results = self.scrape_page(start_url, max_depth=2, test_mode=test_mode)
+            self.batch = seeds is not None
+            if seeds is None:
+                seeds = [make_seed(start_url, 2, test_mode)]
+            self.start_seeds(seeds)
+            
+            if resume:
+                resume_state = self.checkpoint.load()
+                self.checkpoint.resume()
+                self.update_status("running", f"Obnovuji scraping - zbývá {len(resume_state.pending)} stránek...", len(self.unique_domains))
+            else:
+                resume_state = None
+                params = {
+                    'start_url': start_url,
+                    'test_mode': test_mode,
+                    'streaming': self.streaming,
+                    'incremental': self.incremental,
+                    'enrich': self.enrich,
+                    'max_age': self.max_age
+                }
+                if self.batch:
+                    params['seeds'] = seeds
+                self.checkpoint.start(params, [seed['url'] for seed in seeds])
+                if self.batch:
+                    self.update_status("running", f"Spouštím dávkový scraping {len(seeds)} webů...")
+                else:
+                    self.update_status("running", f"Spouštím scraping {'v TEST módu' if test_mode else 'v PLNÉM módu'}...")
+            
+            results = self.crawl(seeds, resume_state=resume_state)
             
             # Finální uložení
             if results:
                 self.save_batch(results)
             
-            final_count = len(self.unique_domains)
-            self.update_status("completed", f"Scraping dokončen! Nalezeno {final_count} AI nástrojů.", final_count)
+            # Zkompaktni log do finálního snapshotu
+            self.results_store.compact()
+            
+            if self.enrich and not self.cancel_event.is_set():
+                self.enrich_results()
+            
+            # Inkrementální běh ukládá jen nové domény - počet uložených je menší než počet nalezených
+            final_count = self.results_store.count if self.incremental else len(self.unique_domains)
+            found_note = f"Nalezeno {len(self.unique_domains)} AI nástrojů, z toho {final_count} nových." if self.incremental \
+                else f"Nalezeno {final_count} AI nástrojů."
+            if self.cancel_event.is_set():
+                self.update_status("cancelled", f"Úloha zrušena. Uloženo {final_count} AI nástrojů.", final_count)
+            else:
+                self.checkpoint.finish()
+                failed = self.metrics.page_errors
+                failed_note = f" ({failed} stránek se nepodařilo stáhnout)" if failed else ""
+                if self.batch:
+                    self.update_status("completed", f"Dávka {len(seeds)} webů dokončena! {found_note}{failed_note}", final_count)
+                else:
+                    self.update_status("completed", f"Scraping dokončen! {found_note}{failed_note}", final_count)
             
             return results
             
         except Exception as e:
             error_msg = f"Kritická chyba: {str(e)}"
+            self.log.exception(error_msg)
             self.update_status("error", error_msg, len(self.unique_domains))
             return []
+        finally:
+            self.results_store.close()
+            self.checkpoint.close()
+            if self.page_index is not None:
+                self.page_index.flush()
+            self.save_metrics()
+            if profiler is not None:
+                profiler.stop()
+                profiler.save(profile_path(self.job_id, self.results_dir))
+                self.log.info("Profil uložen (%d vzorků), nejvíc času: %s", profiler.samples,
+                              ', '.join(f"{name} {count}" for name, count in profiler.top_functions(5)))
+    
+    def enrich_results(self):
+        """Ověří nalezené domény - dostupnost, přesměrování, titulek a popis (fáze po crawlu)"""
+        total = self.results_store.count
+        self.update_status("running", f"Ověřuji dostupnost {total} nalezených domén...", len(self.unique_domains))
+        
+        def progress(done, total):
+            self.update_status("running", f"Ověřuji domény: {done}/{total}", len(self.unique_domains))
+        
+        urls = (result['url'] for result in iter_results(self.job_id, self.results_dir))
+        checked, skipped = get_enricher().enrich(urls, total, self.cancel_event, progress, self.metrics.observe)
+        self.log.info("Ověřeno %d domén, %d přeskočeno (ověřeny nedávno)", checked, skipped)
+        return checked, skipped
+    
+    def run_enrichment_job(self):
+        """Samostatné ověření domén už dokončené úlohy (/enrich/<job_id>)"""
+        try:
+            checked, skipped = self.enrich_results()
+            final_count = len(self.unique_domains)
+            if self.cancel_event.is_set():
+                self.update_status("cancelled", f"Ověřování zrušeno. Ověřeno {checked} domén.", final_count)
+            else:
+                self.update_status("completed", f"Ověření dokončeno! Ověřeno {checked} domén, {skipped} z cache.", final_count)
+        except Exception as e:
+            error_msg = f"Chyba při ověřování domén: {str(e)}"
+            self.log.exception(error_msg)
+            self.update_status("error", error_msg, len(self.unique_domains))
+        finally:
+            self.results_store.close()
+            self.checkpoint.close()
+    
+    def save_metrics(self):
+        """Uloží souhrn časů fází - po uvolnění úlohy z paměti ho vrací /metrics/<job_id>"""
+        try:
+            tmp_file = f"{metrics_path(self.job_id)}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.metrics.snapshot(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, metrics_path(self.job_id))
+        except OSError as e:
+            self.log.warning("⚠️  Nepodařilo se uložit metriky: %s", e)
+
+def metrics_path(job_id):
+    return os.path.join("results", f"{job_id}_metrics.json")
+
+# Plánovač úloh - pevný počet současně běžících crawlerů, ostatní čekají ve frontě
+def evict_job(job_id):
+    """Uvolní dokončenou úlohu z paměti - stav zůstává v souboru"""
+    running_jobs.pop(job_id, None)
+    event_bus.forget(job_id)
+    forget_job(job_id)
+
+scheduler = JobScheduler(on_evict=evict_job)
+
+def read_status(job_id):
+    """Poslední stav úlohy - z paměti, jinak ze souboru (None, když úloha stav nemá)"""
+    status_data = running_jobs.get(job_id)
+    if status_data is None:
+        try:
+            with open(os.path.join("results", f"{job_id}_status.json"), 'r', encoding='utf-8') as f:
+                status_data = json.load(f)
+        except (OSError, ValueError):
+            return None
+    return status_data
+
+def restore_status(scraper, previous):
+    """Vrátí úloze stav před odmítnutým zařazením do fronty a uvolní ji z paměti"""
+    if previous is not None:
+        with scraper.lock:
+            scraper.pending_status = previous
+            scraper.persist_status()
+    evict_job(scraper.job_id)
+
+CallbackMetric('scraper_jobs', 'Úlohy v plánovači podle stavu', 'gauge', ('state',),
+               lambda: {(state,): count for state, count in scheduler.counts().items()})
 
 @app.route('/')
 def index():
@@ -323,33 +853,52 @@ def index():
 
 @app.route('/scrape', methods=['POST'])
 def scrape():
-    """Spustí scraping v background threadu"""
-    data = request.get_json()
+    """Zařadí scraping do fronty úloh"""
+    data = request.get_json(silent=True)
+    try:
+        max_age, priority = parse_job_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     start_url = data.get('url')
     test_mode = data.get('test_mode', False)
+    streaming = data.get('streaming', STREAMING_EXTRACTION)
+    incremental = data.get('incremental', False)
+    profile = data.get('profile', False)
+    enrich = data.get('enrich', False)
     
     if not start_url:
         return jsonify({'error': 'URL není zadané'}), 400
     
+    if scheduler.queue.full():
+        return jsonify({
+            'success': False,
+            'message': 'Fronta úloh je plná, zkuste to prosím později'
+        }), 503
+    
     try:
         # Vytvoř unikátní ID pro úlohu
         job_id = str(uuid.uuid4())[:8]
         
         # Vytvoř nový scraper
-        scraper = AIScraper(job_id)
-        
-        # Spusť scraping v background threadu
-        def run_background_scraping():
-            scraper.run_scraping_job(start_url, test_mode)
+        scraper = AIScraper(job_id, streaming=streaming, incremental=incremental, profile=profile, enrich=enrich, max_age=max_age)
+        scraper.update_status("queued", "Úloha čeká ve frontě na volný worker...")
         
-        thread = threading.Thread(target=run_background_scraping)
-        thread.daemon = True
-        thread.start()
+        # Zařaď úlohu do fronty - spustí ji první volný worker
+        try:
+            scheduler.submit(job_id, lambda: scraper.run_scraping_job(start_url, test_mode), scraper.cancel, priority)
+        except QueueFullError as e:
+            scraper.update_status("error", str(e))
+            # Odmítnutá úloha nikde nečeká - nesmí zůstat v paměti
+            evict_job(job_id)
+            return jsonify({
+                'success': False,
+                'message': 'Fronta úloh je plná, zkuste to prosím později'
+            }), 503
         
         return jsonify({
             'success': True,
             'job_id': job_id,
-            'message': f'Scraping spuštěn v pozadí! ID úlohy: {job_id}',
+            'message': f'Scraping zařazen do fronty! ID úlohy: {job_id}',
             'status_url': f'/status/{job_id}',
             'results_url': f'/results/{job_id}'
         })
@@ -360,29 +909,93 @@ def scrape():
             'message': f'Chyba při spuštění: {str(e)}'
         }), 500
 
-@app.route('/status/<job_id>')
-def get_job_status(job_id):
-    """Vrátí aktuální stav úlohy"""
+@app.route('/scrape/batch', methods=['POST'])
+def scrape_batch():
+    """Zařadí jednu úlohu, která projde víc webů společnou frontou, stahováním a deduplikací"""
+    data = request.get_json(silent=True)
+    try:
+        max_age, priority = parse_job_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    streaming = data.get('streaming', STREAMING_EXTRACTION)
+    incremental = data.get('incremental', False)
+    profile = data.get('profile', False)
+    enrich = data.get('enrich', False)
+    
     try:
-        status_file = os.path.join("results", f"{job_id}_status.json")
+        seeds = parse_seeds(data.get('seeds'), data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if scheduler.queue.full():
+        return jsonify({
+            'success': False,
+            'message': 'Fronta úloh je plná, zkuste to prosím později'
+        }), 503
+    
+    try:
+        job_id = str(uuid.uuid4())[:8]
+        scraper = AIScraper(job_id, streaming=streaming, incremental=incremental, profile=profile, enrich=enrich, max_age=max_age)
+        scraper.update_status("queued", f"Dávka {len(seeds)} webů čeká ve frontě na volný worker...")
         
-        if not os.path.exists(status_file):
+        try:
+            scheduler.submit(job_id, lambda: scraper.run_scraping_job(seeds=seeds), scraper.cancel, priority)
+        except QueueFullError as e:
+            scraper.update_status("error", str(e))
+            # Odmítnutá úloha nikde nečeká - nesmí zůstat v paměti
+            evict_job(job_id)
             return jsonify({
                 'success': False,
-                'message': 'Úloha nenalezena'
-            }), 404
+                'message': 'Fronta úloh je plná, zkuste to prosím později'
+            }), 503
         
-        with open(status_file, 'r', encoding='utf-8') as f:
-            status_data = json.load(f)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'seeds': [seed['url'] for seed in seeds],
+            'message': f'Dávkový scraping {len(seeds)} webů zařazen do fronty! ID úlohy: {job_id}',
+            'status_url': f'/status/{job_id}',
+            'results_url': f'/results/{job_id}'
+        })
         
+    except Exception as e:
         return jsonify({
+            'success': False,
+            'message': f'Chyba při spuštění: {str(e)}'
+        }), 500
+
+@app.route('/status/<job_id>')
+def get_job_status(job_id):
+    """Vrátí aktuální stav úlohy"""
+    try:
+        # Běžící úlohy mají čerstvý stav v paměti, soubor je jen záloha
+        status_data = running_jobs.get(job_id)
+        
+        if status_data is None:
+            status_file = os.path.join("results", f"{job_id}_status.json")
+            
+            if not os.path.exists(status_file):
+                return jsonify({
+                    'success': False,
+                    'message': 'Úloha nenalezena'
+                }), 404
+            
+            with open(status_file, 'r', encoding='utf-8') as f:
+                status_data = json.load(f)
+        
+        response = {
             'success': True,
             'status': status_data['status'],
             'message': status_data['message'],
             'found_count': status_data.get('found_count', 0),
             'timestamp': status_data['timestamp'],
+            'queue_position': scheduler.queue_position(job_id),
             'job_id': job_id
-        })
+        }
+        # Dávková úloha - průběh po jednotlivých seedech
+        if 'seeds' in status_data:
+            response['seeds'] = status_data['seeds']
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -390,37 +1003,205 @@ def get_job_status(job_id):
             'message': f'Chyba při čtení stavu: {str(e)}'
         }), 500
 
+@app.route('/events/<job_id>')
+def job_events(job_id):
+    """Stream průběhu úlohy (Server-Sent Events) - stav a nově nalezené URL"""
+    status_file = os.path.join("results", f"{job_id}_status.json")
+    if event_bus.get_status(job_id) is None and not os.path.exists(status_file):
+        return jsonify({
+            'success': False,
+            'message': 'Úloha nenalezena'
+        }), 404
+    
+    def stream():
+        subscriber = event_bus.subscribe(job_id)
+        try:
+            # Úloha, která už není v paměti - pošli stav ze souboru
+            if subscriber.empty():
+                with open(status_file, 'r', encoding='utf-8') as f:
+                    status_data = json.load(f)
+                yield format_sse('status', status_data)
+                if status_data['status'] in TERMINAL_STATUSES:
+                    return
+            
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event, data)
+                if event == 'status' and data['status'] in TERMINAL_STATUSES:
+                    return
+        finally:
+            event_bus.unsubscribe(job_id, subscriber)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/cancel/<job_id>', methods=['POST'])
+def cancel_job(job_id):
+    """Zruší čekající nebo běžící úlohu"""
+    if not scheduler.cancel(job_id):
+        return jsonify({
+            'success': False,
+            'message': 'Úloha nenalezena nebo už skončila'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'message': f'Úloha {job_id} byla zrušena'
+    })
+
+@app.route('/resume/<job_id>', methods=['POST'])
+def resume_job(job_id):
+    """Obnoví přerušenou úlohu z checkpointu - pokračuje tam, kde crawl skončil"""
+    checkpoint = CrawlCheckpoint(job_id)
+    if not checkpoint.exists():
+        return jsonify({
+            'success': False,
+            'message': 'Úloha nemá checkpoint, nelze ji obnovit'
+        }), 404
+    
+    state = checkpoint.load()
+    if state.finished:
+        return jsonify({
+            'success': False,
+            'message': 'Úloha už byla dokončena'
+        }), 409
+    if scheduler.is_active(job_id):
+        return jsonify({
+            'success': False,
+            'message': 'Úloha už běží nebo čeká ve frontě'
+        }), 409
+    
+    params = state.params
+    data = request.get_json(silent=True) or {}
+    try:
+        _, priority = parse_job_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if scheduler.queue.full():
+        return jsonify({
+            'success': False,
+            'message': 'Fronta úloh je plná, zkuste to prosím později'
+        }), 503
+    
+    previous = read_status(job_id)
+    try:
+        scraper = AIScraper(job_id, streaming=params.get('streaming', STREAMING_EXTRACTION), incremental=params.get('incremental', False),
+                            profile=data.get('profile', False), enrich=params.get('enrich', False), max_age=params.get('max_age'))
+        scraper.update_status("queued", f"Obnovení úlohy čeká ve frontě (zbývá {len(state.pending)} stránek)...", len(scraper.unique_domains))
+        scheduler.submit(job_id, lambda: scraper.run_scraping_job(params.get('start_url'), params.get('test_mode', False), resume=True,
+                                                                 seeds=params.get('seeds')), scraper.cancel, priority)
+    except QueueFullError:
+        restore_status(scraper, previous)
+        return jsonify({
+            'success': False,
+            'message': 'Fronta úloh je plná, zkuste to prosím později'
+        }), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'message': f'Úloha {job_id} pokračuje - zbývá {len(state.pending)} stránek',
+        'status_url': f'/status/{job_id}',
+        'results_url': f'/results/{job_id}'
+    })
+
+@app.route('/enrich/<job_id>', methods=['POST'])
+def enrich_job(job_id):
+    """Ověří nalezené domény už dokončené úlohy - stav, přesměrování, titulek a popis"""
+    if not results_exist(job_id):
+        return jsonify({
+            'success': False,
+            'message': 'Výsledky nenalezeny'
+        }), 404
+    if scheduler.is_active(job_id):
+        return jsonify({
+            'success': False,
+            'message': 'Úloha už běží nebo čeká ve frontě'
+        }), 409
+
+    data = request.get_json(silent=True) or {}
+    try:
+        _, priority = parse_job_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if scheduler.queue.full():
+        return jsonify({
+            'success': False,
+            'message': 'Fronta úloh je plná, zkuste to prosím později'
+        }), 503
+
+    previous = read_status(job_id)
+    try:
+        scraper = AIScraper(job_id)
+        scraper.update_status("queued", "Ověření domén čeká ve frontě...", len(scraper.unique_domains))
+        scheduler.submit(job_id, scraper.run_enrichment_job, scraper.cancel, priority)
+    except QueueFullError:
+        restore_status(scraper, previous)
+        return jsonify({
+            'success': False,
+            'message': 'Fronta úloh je plná, zkuste to prosím později'
+        }), 503
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'message': f'Ověření domén úlohy {job_id} zařazeno do fronty',
+        'status_url': f'/status/{job_id}',
+        'results_url': f'/results/{job_id}'
+    })
+
 @app.route('/results/<job_id>')
 def get_job_results(job_id):
     """Vrátí výsledky úlohy po dávkách"""
     try:
-        results_file = os.path.join("results", f"{job_id}_results.json")
-        
-        if not os.path.exists(results_file):
+        if not results_exist(job_id):
             return jsonify({
                 'success': False,
                 'message': 'Výsledky nenalezeny'
             }), 404
         
-        with open(results_file, 'r', encoding='utf-8') as f:
-            all_results = json.load(f)
-        
         # Parametry pro stránkování
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
+        # U dávkové úlohy lze výsledky filtrovat podle výchozího webu
+        seed = request.args.get('seed')
         
         # Výpočet rozsahu
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
         
-        batch_results = all_results[start_idx:end_idx]
-        has_more = end_idx < len(all_results)
+        # Bez filtru se stránka čte přes index offsetů, jinak se log projde postupně
+        page_data = None if seed else read_page(job_id, max(start_idx, 0), per_page)
+        if page_data is not None:
+            batch_results, total_found = page_data
+        else:
+            batch_results = []
+            total_found = 0
+            results = iter_results(job_id)
+            if seed:
+                results = (result for result in results if result.get('seed') == seed)
+            for i, result in enumerate(results):
+                if start_idx <= i < end_idx:
+                    batch_results.append(result)
+                total_found = i + 1
+        has_more = end_idx < total_found
+        # Údaje z ověření domén (stav, titulek, popis), pokud už proběhlo
+        batch_results = get_enricher().merge(batch_results)
         
         return jsonify({
             'success': True,
             'urls': [r['url'] for r in batch_results],
             'detailed_results': batch_results,
-            'total_found': len(all_results),
+            'total_found': total_found,
             'page': page,
             'per_page': per_page,
             'has_more': has_more,
@@ -433,31 +1214,136 @@ def get_job_results(job_id):
             'message': f'Chyba při čtení výsledků: {str(e)}'
         }), 500
 
+def iter_download(job_id, fmt):
+    """Výsledky ve zvoleném formátu po blocích - soubor se nikam nezapisuje"""
+    results = iter_results(job_id)
+    if fmt == 'jsonl':
+        while True:
+            chunk = list(islice(results, DOWNLOAD_CHUNK))
+            if not chunk:
+                return
+            yield ''.join(json.dumps(result, ensure_ascii=False) + "\n" for result in get_enricher().merge(chunk))
+    elif fmt == 'csv':
+        columns = ['url', 'found_at', 'seed', 'status', 'final_url', 'title', 'description', 'error']
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        while True:
+            chunk = list(islice(results, DOWNLOAD_CHUNK))
+            if not chunk:
+                break
+            for result in get_enricher().merge(chunk):
+                writer.writerow([result.get(column) or '' for column in columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        yield "# AI Nástroje nalezené scraperem\n\n"
+        lines = []
+        for i, result in enumerate(results, 1):
+            lines.append(f"{i}. {result['url']}\n")
+            if len(lines) >= DOWNLOAD_CHUNK:
+                yield ''.join(lines)
+                lines = []
+        yield ''.join(lines)
+
 @app.route('/download/<job_id>')
 def download_results(job_id):
-    """Stáhne výsledky jako textový soubor"""
+    """Stáhne výsledky jako TXT, CSV nebo JSONL (?format=) - streamuje přímo z logu"""
+    if not results_exist(job_id):
+        return jsonify({'error': 'Výsledky nenalezeny'}), 404
+    
+    fmt = request.args.get('format', 'txt')
+    if fmt not in DOWNLOAD_FORMATS:
+        return jsonify({'error': f'Neznámý formát {fmt}, podporované: {", ".join(DOWNLOAD_FORMATS)}'}), 400
+    
+    return Response(iter_download(job_id, fmt), mimetype=DOWNLOAD_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename=ai_tools_{job_id}.{fmt}'
+    })
+
+@app.route('/index/new/<job_id>')
+def get_new_domains(job_id):
+    """Vrátí domény, které úloha našla jako první ze všech crawlů (novinky od minula)"""
     try:
-        results_file = os.path.join("results", f"{job_id}_results.json")
-        
-        if not os.path.exists(results_file):
-            return jsonify({'error': 'Výsledky nenalezeny'}), 404
-        
-        with open(results_file, 'r', encoding='utf-8') as f:
-            all_results = json.load(f)
-        
-        # Vytvoř textový soubor
-        txt_content = "# AI Nástroje nalezené scraperem\n\n"
-        for i, result in enumerate(all_results, 1):
-            txt_content += f"{i}. {result['url']}\n"
-        
-        txt_file = os.path.join("results", f"{job_id}_urls.txt")
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(txt_content)
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        total_new = get_domain_index().count_new_in_job(job_id)
+        new_domains = get_domain_index().new_in_job(job_id, limit=per_page, offset=(page - 1) * per_page)
         
-        return send_file(txt_file, as_attachment=True, download_name=f"ai_tools_{job_id}.txt")
+        return jsonify({
+            'success': True,
+            'urls': [d['url'] for d in new_domains],
+            'detailed_results': new_domains,
+            'total_new': total_new,
+            'page': page,
+            'per_page': per_page,
+            'has_more': page * per_page < total_new,
+            'job_id': job_id
+        })
         
     except Exception as e:
-        return jsonify({'error': f'Chyba při stahování: {str(e)}'}), 500
+        return jsonify({
+            'success': False,
+            'message': f'Chyba při čtení indexu: {str(e)}'
+        }), 500
+
+@app.route('/index/domain')
+def lookup_domain():
+    """Vrátí historii jedné domény v globálním indexu"""
+    url = request.args.get('url', '')
+    info = get_domain_index().lookup(get_main_domain(url) if '://' in url else f"https://{url}")
+    if info is None:
+        return jsonify({
+            'success': False,
+            'message': 'Doména v indexu není'
+        }), 404
+    return jsonify(dict(info, success=True))
+
+@app.route('/index/stats')
+def index_stats():
+    """Souhrnné statistiky globálního indexu domén"""
+    stats = get_domain_index().stats()
+    page_index = get_page_index()
+    if page_index is not None:
+        stats['pages'] = page_index.stats()
+    return jsonify(dict(stats, success=True))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Metriky crawleru ve formátu Prometheus - časy fází, stránky, úlohy"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/<job_id>')
+def job_metrics(job_id):
+    """Rozpad času úlohy podle fází (stahování, regexy, parsování, klasifikace, ukládání)"""
+    job = get_job_metrics(job_id)
+    if job is not None:
+        return jsonify(dict(job.snapshot(), success=True))
+    
+    if not os.path.exists(metrics_path(job_id)):
+        return jsonify({
+            'success': False,
+            'message': 'Metriky úlohy nenalezeny'
+        }), 404
+    with open(metrics_path(job_id), 'r', encoding='utf-8') as f:
+        return jsonify(dict(json.load(f), success=True))
+
+@app.route('/hosts')
+def host_stats():
+    """Stav zdvořilosti vůči hostitelům - souběžnost, rozestup, odezva, circuit breaker"""
+    return jsonify({'hosts': host_throttle.stats(), 'success': True})
+
+@app.route('/profile/<job_id>')
+def job_profile(job_id):
+    """Stáhne profil úlohy (folded stacks pro flamegraph.pl / speedscope)"""
+    path = profile_path(job_id)
+    if not os.path.exists(path):
+        return jsonify({
+            'success': False,
+            'message': 'Úloha nebyla profilována'
+        }), 404
+    return send_file(os.path.abspath(path), mimetype='text/plain', as_attachment=True, download_name=f"profile_{job_id}.folded")
 
 @app.route('/jobs')
 def list_jobs():
@@ -471,15 +1357,21 @@ def list_jobs():
             if filename.endswith("_status.json"):
                 job_id = filename.replace("_status.json", "")
                 
-                with open(os.path.join("results", filename), 'r', encoding='utf-8') as f:
-                    status_data = json.load(f)
+                # Běžící úlohy z paměti, ostatní ze souboru
+                status_data = running_jobs.get(job_id)
+                if status_data is None:
+                    with open(os.path.join("results", filename), 'r', encoding='utf-8') as f:
+                        status_data = json.load(f)
                 
                 jobs.append({
                     'job_id': job_id,
                     'status': status_data['status'],
                     'message': status_data['message'],
                     'found_count': status_data.get('found_count', 0),
-                    'timestamp': status_data['timestamp']
+                    'timestamp': status_data['timestamp'],
+                    # Nedokončená úloha, která neběží (např. po restartu serveru)
+                    'resumable': (status_data['status'] != 'completed' and not scheduler.is_active(job_id)
+                                  and os.path.exists(checkpoint_path(job_id)))
                 })
         
         # Seřaď podle času (nejnovější první)
@@ -493,6 +1385,6 @@ def list_jobs():
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5001))
-    print("Spouštím AI Scraper...")
-    print(f"Otevřete http://localhost:{port} ve vašem prohlížeči")
+    log.info("Spouštím AI Scraper...")
+    log.info("Otevřete http://localhost:%d ve vašem prohlížeči", port)
     app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""Offline benchmark scraperu nad lokálním fixture webem
+
+Spustí lokální HTTP server s vygenerovaným "srovnávacím" webem, projde ho
+celým run_scraping_job a změří i hot-path funkce zvlášť. Výsledky zapíše
+jako JSON, aby šly porovnat mezi commity:
+
+    python benchmark.py --pages 300 --output bench.json
+    python benchmark.py --compare bench.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOL_WORDS = ['chat', 'write', 'pixel', 'voice', 'code', 'data', 'vision', 'note', 'flow', 'mind']
+TOOL_TLDS = ['.ai', '.io', '.app', '.com', '.tech', '.co', '.org']
+
+
+class FixtureSite:
+    """Deterministicky vygenerovaný web - stránky s interními odkazy, odkazy na nástroje a JSON daty"""
+    def __init__(self, pages=200, links_per_page=30, tools_per_page=20, json_tools=20, page_kb=50, seed=42):
+        self.pages = pages
+        self.links_per_page = links_per_page
+        self.tools_per_page = tools_per_page
+        self.json_tools = json_tools
+        self.page_kb = page_kb
+        self.seed = seed
+        self.cache = {}
+
+    def tool_url(self, rng):
+        name = rng.choice(TOOL_WORDS) + rng.choice(TOOL_WORDS) + str(rng.randint(0, 5000))
+        return f"https://www.{name}{rng.choice(TOOL_TLDS)}/"
+
+    def render(self, page_id):
+        """HTML stránky page_id (0 = úvodní stránka)"""
+        if page_id in self.cache:
+            return self.cache[page_id]
+        rng = random.Random(self.seed * 100003 + page_id)
+        internal = [f'<a href="/category/{rng.randrange(self.pages)}">Kategorie</a>' for _ in range(self.links_per_page)]
+        tools = [f'<a href="{self.tool_url(rng)}">Nástroj</a>' for _ in range(self.tools_per_page)]
+        social = ['<a href="https://twitter.com/x">Twitter</a>', '<a href="https://github.com/x">GitHub</a>']
+        blob = json.dumps({'props': {'pageProps': {'tools': [
+            {'name': f'tool{i}', 'websiteUrl': self.tool_url(rng).rstrip('/'), 'url': self.tool_url(rng)}
+            for i in range(self.json_tools)
+        ]}}}, separators=(',', ':'))
+        body = (
+            f"<html><head><title>Fixture {page_id}</title></head><body>"
+            f"<nav>{''.join(internal)}</nav><main>{''.join(tools)}{''.join(social)}</main>"
+            f'<script id="__NEXT_DATA__" type="application/json">{blob}</script>'
+        )
+        # Doplň stránku na požadovanou velikost běžným textem
+        filler = "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>"
+        missing = self.page_kb * 1024 - len(body)
+        if missing > 0:
+            body += filler * (missing // len(filler) + 1)
+        html = (body + "</body></html>").encode('utf-8')
+        self.cache[page_id] = html
+        return html
+
+    def serve(self):
+        """Spustí HTTP server na volném portu, vrací (server, base_url)"""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?')[0].rstrip('/')
+                if path == '':
+                    page_id = 0
+                elif path.startswith('/category/') and path[10:].isdigit():
+                    page_id = int(path[10:])
+                else:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                etag = f'"fixture-{site.seed}-{page_id}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                body = site.render(page_id)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # Linux vrací ru_maxrss v KB, macOS v bajtech
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024, 1)
+
+
+def timed(func, repeat):
+    """Nejlepší čas z několika opakování (s)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_crawl(app, base_url, test_mode=False):
+    """Celý run_scraping_job proti fixture webu - stránky/s, URL/s a latence stránek"""
+    latencies = []
+
+    class TimingFetcher(app.Fetcher):
+        def fetch(self, url):
+            start = time.perf_counter()
+            try:
+                return super().fetch(url)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        def iter_text(self, url, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                yield from super().iter_text(url, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    scraper = app.AIScraper(f"bench-crawl-{int(time.time() * 1000)}")
+    scraper.fetcher = TimingFetcher(cache=None)
+    start = time.perf_counter()
+    scraper.run_scraping_job(base_url, test_mode=test_mode)
+    elapsed = time.perf_counter() - start
+
+    found = scraper.results_store.count
+    stages = scraper.metrics.snapshot()['stages']
+    return {
+        'seconds': round(elapsed, 3),
+        'pages': len(latencies),
+        'urls': found,
+        'pages_per_sec': round(len(latencies) / elapsed, 2),
+        'urls_per_sec': round(found / elapsed, 2),
+        'page_latency_p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'page_latency_p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'page_latency_mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        # Součet časů fází přes všechna vlákna (může přesáhnout seconds)
+        'stage_seconds': {stage: info['total_seconds'] for stage, info in stages.items()}
+    }
+
+
+def bench_micro(app, site, repeat):
+    """Mikrobenchmarky hot-path funkcí AIScraper"""
+    results = {}
+    scraper = app.AIScraper(f"bench-micro-{int(time.time() * 1000)}")
+    content = b''.join(site.render(i) for i in range(1, 21)).decode('utf-8')
+
+    def extract():
+        scraper.unique_domains.clear()
+        scraper.extract_all_links_from_content(content, "http://127.0.0.1/")
+    seconds = timed(extract, repeat)
+    results['extract_all_links_from_content'] = {
+        'content_mb': round(len(content) / (1024 * 1024), 2),
+        'seconds': round(seconds, 4),
+        'mb_per_sec': round(len(content) / (1024 * 1024) / seconds, 2)
+    }
+
+    rng = random.Random(site.seed)
+    urls = []
+    for _ in range(50000):
+        if rng.random() < 0.5:
+            urls.append(site.tool_url(rng) + rng.choice(['', 'pricing', 'blog/post']))
+        else:
+            urls.append(f"https://{rng.choice(['example', 'news', 'shop'])}{rng.randint(0, 999)}.com/{rng.choice(['tool', 'about', 'x'])}")
+    seconds = timed(lambda: [scraper.is_ai_tool_domain(url) for url in urls], repeat)
+    results['is_ai_tool_domain'] = {
+        'urls': len(urls),
+        'seconds': round(seconds, 4),
+        'urls_per_sec': round(len(urls) / seconds)
+    }
+
+    # Deduplikace nálezů a navštívených stránek (podle DEDUP_MODE)
+    import dedup
+    dedup_urls = [f"https://tool{i}.ai" for i in range(100000)]
+
+    def dedup_add():
+        seen = dedup.make_dedup_set()
+        for url in dedup_urls + dedup_urls[:50000]:
+            seen.add(url)
+    seconds = timed(dedup_add, repeat)
+    results['dedup_add'] = {
+        'mode': dedup.DEDUP_MODE,
+        'urls': len(dedup_urls) + 50000,
+        'seconds': round(seconds, 4),
+        'urls_per_sec': round((len(dedup_urls) + 50000) / seconds)
+    }
+
+    batches = [[f"https://tool{b}x{i}.ai" for i in range(20)] for b in range(250)]
+
+    def save():
+        store_scraper = app.AIScraper(f"bench-save-{time.perf_counter_ns()}")
+        for batch in batches:
+            store_scraper.save_batch(batch)
+        store_scraper.results_store.close()
+    seconds = timed(save, repeat)
+    total = sum(len(b) for b in batches)
+    results['save_batch'] = {
+        'batches': len(batches),
+        'urls': total,
+        'seconds': round(seconds, 4),
+        'urls_per_sec': round(total / seconds)
+    }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline):
+    """Vypíše poměry proti uloženému běhu (>1 = rychlejší než baseline)"""
+    print(f"\n📊 Porovnání s {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')})")
+    pairs = [
+        ('crawl', 'pages_per_sec'), ('crawl', 'urls_per_sec'),
+        ('micro.extract_all_links_from_content', 'mb_per_sec'),
+        ('micro.is_ai_tool_domain', 'urls_per_sec'),
+        ('micro.dedup_add', 'urls_per_sec'),
+        ('micro.save_batch', 'urls_per_sec')
+    ]
+    for section, key in pairs:
+        old, new = baseline, current
+        for part in section.split('.'):
+            old = (old or {}).get(part)
+            new = (new or {}).get(part)
+        if old and new and old.get(key) and new.get(key):
+            print(f"  {section}.{key}: {old[key]} → {new[key]} ({new[key] / old[key]:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark AI scraperu nad lokálním fixture webem")
+    parser.add_argument('--pages', type=int, default=200, help="počet stránek fixture webu")
+    parser.add_argument('--links', type=int, default=30, help="interních odkazů na stránku")
+    parser.add_argument('--tools', type=int, default=20, help="odkazů na nástroje na stránku")
+    parser.add_argument('--json-tools', type=int, default=20, help="nástrojů ve vloženém JSON na stránku")
+    parser.add_argument('--page-kb', type=int, default=50, help="velikost stránky v KB")
+    parser.add_argument('--repeat', type=int, default=3, help="opakování mikrobenchmarků")
+    parser.add_argument('--test-mode', action='store_true', help="crawl v test módu")
+    parser.add_argument('--skip-crawl', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--output', default='benchmark_results.json', help="kam zapsat JSON s výsledky")
+    parser.add_argument('--compare', help="JSON z dřívějšího běhu pro porovnání")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    output = os.path.abspath(args.output)
+
+    # Fixture web je lokální - zdvořilostní pauzy by měřily jen čekání
+    os.environ.setdefault('HOST_MIN_INTERVAL', '0')
+    os.environ.setdefault('HOST_MAX_CONCURRENCY', '64')
+    os.environ.setdefault('HOST_START_CONCURRENCY', '64')
+    # Průběh crawlu by zahltil terminál - zprávy na úrovni INFO se vypnou (jejich cena se neměří)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    # Scraper zapisuje výsledky, cache a index relativně k pracovnímu adresáři
+    workdir = tempfile.mkdtemp(prefix='ai-scraper-bench-')
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import app
+
+    site = FixtureSite(args.pages, args.links, args.tools, args.json_tools, args.page_kb)
+    server, base_url = site.serve()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'params': {
+            'pages': args.pages, 'links': args.links, 'tools': args.tools, 'json_tools': args.json_tools,
+            'page_kb': args.page_kb, 'test_mode': args.test_mode,
+            'crawl_max_workers': app.CRAWL_MAX_WORKERS, 'parse_processes': app.PARSE_PROCESSES,
+            'streaming': app.STREAMING_EXTRACTION
+        }
+    }
+    try:
+        if not args.skip_crawl:
+            print("🕷️  Crawl benchmark...")
+            report['crawl'] = bench_crawl(app, base_url, args.test_mode)
+        if not args.skip_micro:
+            print("⏱️  Mikrobenchmarky...")
+            report['micro'] = bench_micro(app, site, args.repeat)
+    finally:
+        server.shutdown()
+    report['peak_rss_mb'] = peak_rss_mb()
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"💾 Výsledky zapsány do {output}")
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Bloom filtr - rychlá negativní odpověď "tohle jsme ještě neviděli" s malou pamětí"""
+import hashlib
+import math
+
+
+def item_hashes(item):
+    """Dvojice 64bitových hashů z jednoho 128bitového otisku (h2 je liché)"""
+    digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """Bitové pole s k hashovacími funkcemi. False je vždy pravda, True jen s pravděpodobností"""
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def positions(self, item):
+        """Pozice bitů pro položku - double hashing z jednoho 128bitového otisku"""
+        h1, h2 = item_hashes(item)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        """Přidá položku. Vrací True, pokud tam (zřejmě) ještě nebyla"""
+        return self.add_hashes(*item_hashes(item))
+
+    def add_hashes(self, h1, h2):
+        added = False
+        bits = self.bits
+        num_bits = self.num_bits
+        # (h1 + i * h2) % num_bits postupně a s malými čísly
+        pos = h1 % num_bits
+        step = h2 % num_bits
+        for _ in range(self.num_hashes):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                added = True
+            pos = (pos + step) % num_bits
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        return self.contains_hashes(*item_hashes(item))
+
+    def contains_hashes(self, h1, h2):
+        """Pozice se počítají postupně - chybějící položka většinou skončí po pár bitech"""
+        bits = self.bits
+        num_bits = self.num_bits
+        pos = h1 % num_bits
+        step = h2 % num_bits
+        for _ in range(self.num_hashes):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+            pos = (pos + step) % num_bits
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def is_full(self):
+        """Po překročení kapacity roste chybovost nad error_rate"""
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """Řada Bloom filtrů s rostoucí kapacitou - není potřeba znát počet položek předem
+
+    Každý další filtr má dvojnásobnou kapacitu a poloviční chybovost, takže
+    součet chybovostí všech filtrů nepřekročí error_rate.
+    """
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity=65536, error_rate=0.001):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.clear()
+
+    def clear(self):
+        self.filters = []
+        self.count = 0
+        self.add_filter()
+
+    def add_filter(self):
+        n = len(self.filters)
+        self.filters.append(BloomFilter(self.initial_capacity * self.GROWTH ** n,
+                                        self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** n))
+
+    def add(self, item):
+        """Přidá položku. Vrací True, pokud tam (zřejmě) ještě nebyla"""
+        hashes = item_hashes(item)
+        if self.contains_hashes(*hashes):
+            return False
+        current = self.filters[-1]
+        current.add_hashes(*hashes)
+        self.count += 1
+        if current.is_full():
+            self.add_filter()
+        return True
+
+    def __contains__(self, item):
+        return self.contains_hashes(*item_hashes(item))
+
+    def contains_hashes(self, h1, h2):
+        # Otisk se spočítá jednou pro všechny filtry, nejnovější (největší) filtr je první
+        for bloom in reversed(self.filters):
+            if bloom.contains_hashes(h1, h2):
+                return True
+        return False
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
@@ -0,0 +1,115 @@
+"""Průběžný checkpoint crawlu - fronta stránek a hotové stránky pro obnovení po pádu"""
+import json
+import os
+import threading
+import time
+
+from results_store import RESULTS_DIR, FSYNC_BATCH, FSYNC_INTERVAL
+
+
+def checkpoint_path(job_id, results_dir=RESULTS_DIR):
+    return os.path.join(results_dir, f"{job_id}_frontier.jsonl")
+
+
+class CrawlState:
+    """Stav crawlu obnovený z checkpointu"""
+    def __init__(self):
+        self.params = {}
+        self.enqueued = {}  # url -> (hloubka, index seedu), v pořadí zařazení
+        self.done = set()
+        self.finished = False
+
+    @property
+    def pending(self):
+        """Stránky zařazené do fronty, které ještě nebyly zpracované"""
+        return [(url, depth, seed) for url, (depth, seed) in self.enqueued.items() if url not in self.done]
+
+
+class CrawlCheckpoint:
+    """Append-only log crawlu: start (parametry), enqueue (url, hloubka, seed), done (url), finished"""
+    def __init__(self, job_id, results_dir=RESULTS_DIR):
+        self.job_id = job_id
+        self.path = checkpoint_path(job_id, results_dir)
+        self.lock = threading.Lock()
+        self.handle = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Přehraje log a vrátí CrawlState, nedopsaný poslední záznam ignoruje"""
+        state = CrawlState()
+        if not self.exists():
+            return state
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                op = record.get('op')
+                if op == 'start':
+                    state.params = record.get('params', {})
+                elif op == 'enqueue':
+                    # Starší checkpointy seed neukládaly - měly vždy jen jeden
+                    state.enqueued.setdefault(record['url'], (record['depth'], record.get('seed', 0)))
+                elif op == 'done':
+                    state.done.add(record['url'])
+                elif op == 'finished':
+                    state.finished = True
+                elif op == 'resume':
+                    state.finished = False
+        return state
+
+    def start(self, params, start_urls):
+        """Nový crawl - zahodí starý checkpoint a zapíše parametry a výchozí stránky (seedy)"""
+        with self.lock:
+            self.close_locked()
+            if self.exists():
+                os.remove(self.path)
+            self.write_locked([{'op': 'start', 'params': params}] + [
+                {'op': 'enqueue', 'url': url, 'depth': 0, 'seed': seed} for seed, url in enumerate(start_urls)
+            ], sync=True)
+
+    def resume(self):
+        with self.lock:
+            self.write_locked([{'op': 'resume'}], sync=True)
+
+    def page_done(self, url, subpages, depth, seed=0):
+        """Zapíše nové podstránky a dokončení stránky jedním zápisem (podstránky první)"""
+        records = [{'op': 'enqueue', 'url': subpage, 'depth': depth, 'seed': seed} for subpage in subpages]
+        records.append({'op': 'done', 'url': url})
+        with self.lock:
+            self.write_locked(records)
+
+    def finish(self):
+        with self.lock:
+            self.write_locked([{'op': 'finished'}], sync=True)
+            self.close_locked()
+
+    def write_locked(self, records, sync=False):
+        if self.handle is None:
+            self.handle = open(self.path, 'a', encoding='utf-8')
+        self.handle.write(''.join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self.handle.flush()
+        self.unsynced += len(records)
+        if sync or self.unsynced >= FSYNC_BATCH or time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+            os.fsync(self.handle.fileno())
+            self.unsynced = 0
+            self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.close_locked()
+
+    def close_locked(self):
+        if self.handle is not None:
+            if self.unsynced:
+                os.fsync(self.handle.fileno())
+                self.unsynced = 0
+            self.handle.close()
+            self.handle = None
@@ -0,0 +1,122 @@
+"""Kompaktní množiny pro deduplikaci URL a domén při velkých crawlech
+
+Místo celých řetězců se ukládají 64bitové otisky v poli array('Q')
+s otevřenou adresací - zhruba 11-23 B na položku místo ~100 B pro řetězec
+v set(). Pravděpodobnost kolize otisků je u milionu položek ~1e-8.
+Otisky se nikam neukládají, stačí proto vestavěný (SipHash) hash řetězce,
+který si Python u řetězce pamatuje.
+Režim "bloom" drží ještě méně paměti za cenu nastavitelné chybovosti
+(nová položka může být občas považována za duplikát).
+"""
+import os
+from array import array
+
+from bloom import ScalableBloomFilter
+
+# set = přesné řetězce (původní chování), fingerprint = 64bitové otisky, bloom = škálovatelný Bloom filtr
+DEDUP_MODE = os.environ.get('DEDUP_MODE', 'fingerprint')
+DEDUP_ERROR_RATE = float(os.environ.get('DEDUP_ERROR_RATE', 0.0001))
+DEDUP_INITIAL_CAPACITY = int(os.environ.get('DEDUP_INITIAL_CAPACITY', 65536))
+# Pole se zdvojnásobí, když je zaplněné víc než z této části
+MAX_LOAD = 0.7
+HASH_MASK = (1 << 64) - 1
+
+
+def fingerprint(item):
+    """64bitový otisk řetězce (platí jen v rámci procesu), nikdy 0 - 0 značí prázdný slot"""
+    return hash(item) & HASH_MASK or 1
+
+
+class ExactSet(set):
+    """Běžná množina řetězců, add ale vrací True/False jako ostatní dedup množiny"""
+    def add(self, item):
+        if item in self:
+            return False
+        super().add(item)
+        return True
+
+
+class FingerprintSet:
+    """Množina otisků s lineárním hledáním volného slotu - O(1) add a in"""
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        size = 16
+        while size * MAX_LOAD < self.capacity:
+            size *= 2
+        self.slots = array('Q', [0]) * size
+        self.mask = size - 1
+        self.count = 0
+
+    def add(self, item):
+        """Přidá položku. Vrací True, pokud tam ještě nebyla"""
+        value = fingerprint(item)
+        slots = self.slots
+        mask = self.mask
+        i = value & mask
+        while True:
+            current = slots[i]
+            if current == 0:
+                slots[i] = value
+                self.count += 1
+                if self.count > len(slots) * MAX_LOAD:
+                    self.grow()
+                return True
+            if current == value:
+                return False
+            i = (i + 1) & mask
+
+    def __contains__(self, item):
+        value = fingerprint(item)
+        slots = self.slots
+        mask = self.mask
+        i = value & mask
+        while True:
+            current = slots[i]
+            if current == value:
+                return True
+            if current == 0:
+                return False
+            i = (i + 1) & mask
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def grow(self):
+        old_slots = self.slots
+        size = len(old_slots) * 2
+        slots = array('Q', [0]) * size
+        mask = size - 1
+        for value in old_slots:
+            if value:
+                i = value & mask
+                while slots[i]:
+                    i = (i + 1) & mask
+                slots[i] = value
+        self.slots = slots
+        self.mask = mask
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.slots) * self.slots.itemsize
+
+
+def make_dedup_set(mode=None, capacity=DEDUP_INITIAL_CAPACITY, error_rate=DEDUP_ERROR_RATE):
+    """Vytvoří množinu pro deduplikaci podle DEDUP_MODE
+
+    Všechny podporují in, len, update a add, které vrací True, pokud položka byla nová.
+    """
+    mode = mode or DEDUP_MODE
+    if mode == 'set':
+        return ExactSet()
+    if mode == 'bloom':
+        return ScalableBloomFilter(capacity, error_rate)
+    if mode == 'fingerprint':
+        return FingerprintSet(capacity)
+    raise ValueError(f"Neznámý DEDUP_MODE: {mode}")
@@ -0,0 +1,143 @@
+"""Globální index domén napříč všemi úlohami (SQLite + Bloom filtr pro rychlé negativní dotazy)"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from bloom import BloomFilter
+
+DOMAIN_INDEX_FILE = os.environ.get('DOMAIN_INDEX_FILE', os.path.join('results', 'domain_index.sqlite3'))
+BLOOM_ERROR_RATE = 0.001
+BLOOM_MIN_CAPACITY = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    first_job TEXT NOT NULL,
+    last_job TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS domains_first_job ON domains(first_job);
+CREATE INDEX IF NOT EXISTS domains_first_seen ON domains(first_seen);
+CREATE TABLE IF NOT EXISTS domain_jobs (
+    domain TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    seen_at TEXT NOT NULL,
+    PRIMARY KEY (domain, job_id)
+);
+CREATE INDEX IF NOT EXISTS domain_jobs_job ON domain_jobs(job_id);
+"""
+
+
+def open_database(path, schema):
+    """Otevře SQLite databázi sdílenou vlákny (přístup hlídá zámek volajícího) a založí schéma"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(schema)
+    return db
+
+
+class DomainIndex:
+    """Pamatuje si, kdy a ve které úloze byla doména poprvé a naposledy nalezena"""
+    def __init__(self, path=DOMAIN_INDEX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = open_database(path, SCHEMA)
+        self.rebuild_bloom()
+
+    def rebuild_bloom(self):
+        """Postaví Bloom filtr ze všech známých domén (při startu a po naplnění kapacity)"""
+        total = self.db.execute("SELECT COUNT(*) FROM domains").fetchone()[0]
+        bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, total * 2), BLOOM_ERROR_RATE)
+        for (domain,) in self.db.execute("SELECT domain FROM domains"):
+            bloom.add(domain)
+        self.bloom = bloom
+
+    def contains(self, domain):
+        """Byla doména už někdy nalezena? Negativní odpověď většinou vrátí jen Bloom filtr"""
+        if domain not in self.bloom:
+            return False
+        with self.lock:
+            row = self.db.execute("SELECT 1 FROM domains WHERE domain = ?", (domain,)).fetchone()
+        return row is not None
+
+    def record(self, domains, job_id):
+        """Zaznamená nalezené domény úlohy. Vrací ty, které index ještě nikdy neviděl"""
+        if not domains:
+            return []
+        now = datetime.now().isoformat()
+        with self.lock:
+            # Bloom filtr rozdělí domény na jistě nové a možná známé - jen ty druhé se ověřují v DB
+            maybe_known = [d for d in domains if d in self.bloom]
+            known = set()
+            for start in range(0, len(maybe_known), 500):
+                chunk = maybe_known[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                known.update(row[0] for row in self.db.execute(
+                    f"SELECT domain FROM domains WHERE domain IN ({placeholders})", chunk))
+
+            new_domains = []
+            seen = set()
+            for domain in domains:
+                if domain not in known and domain not in seen:
+                    new_domains.append(domain)
+                seen.add(domain)
+
+            with self.db:
+                self.db.executemany(
+                    "INSERT INTO domains (domain, first_seen, last_seen, first_job, last_job) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(domain) DO UPDATE SET last_seen = excluded.last_seen, last_job = excluded.last_job",
+                    [(domain, now, now, job_id, job_id) for domain in seen])
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO domain_jobs (domain, job_id, seen_at) VALUES (?, ?, ?)",
+                    [(domain, job_id, now) for domain in seen])
+
+            for domain in new_domains:
+                self.bloom.add(domain)
+            if self.bloom.is_full():
+                self.rebuild_bloom()
+            return new_domains
+
+    def new_in_job(self, job_id, limit=None, offset=0):
+        """Domény, které poprvé našla daná úloha - tj. novinky oproti všem předchozím crawlům"""
+        sql = "SELECT domain, first_seen FROM domains WHERE first_job = ? ORDER BY first_seen, domain"
+        params = [job_id]
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return [{'url': domain, 'first_seen': first_seen} for domain, first_seen in rows]
+
+    def count_new_in_job(self, job_id):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM domains WHERE first_job = ?", (job_id,)).fetchone()[0]
+
+    def lookup(self, domain):
+        """Detail domény - první/poslední nález a všechny úlohy, které ji našly"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT first_seen, last_seen, first_job, last_job FROM domains WHERE domain = ?", (domain,)).fetchone()
+            if row is None:
+                return None
+            jobs = [r[0] for r in self.db.execute(
+                "SELECT job_id FROM domain_jobs WHERE domain = ? ORDER BY seen_at", (domain,))]
+        return {
+            'url': domain,
+            'first_seen': row[0],
+            'last_seen': row[1],
+            'first_job': row[2],
+            'last_job': row[3],
+            'jobs': jobs
+        }
+
+    def stats(self):
+        with self.lock:
+            total = self.db.execute("SELECT COUNT(*) FROM domains").fetchone()[0]
+            jobs = self.db.execute("SELECT COUNT(DISTINCT job_id) FROM domain_jobs").fetchone()[0]
+        return {'total_domains': total, 'jobs': jobs}
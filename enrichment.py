@@ -0,0 +1,214 @@
+"""Ověření nalezených domén - dostupnost, cílová URL po přesměrování, HTTP stav, titulek a popis
+
+Domény se ověřují hromadně souběžnými GET požadavky přes vlastní pool spojení
+s krátkým timeoutem. Z těla se čte jen začátek (hlavička HTML), takže jeden
+požadavek stačí na stav i metadata. Výsledky se ukládají do SQLite cache
+sdílené všemi úlohami - domény ověřené v posledních ENRICH_TTL_HOURS se
+přeskočí. K výsledkům úlohy se údaje připojují až při čtení (/results, /download),
+log výsledků se kvůli nim nepřepisuje.
+
+Nalezené URL pocházejí z cizích stránek - na hostitele s neveřejnou adresou
+(localhost, vnitřní síť, metadata cloudu) se nic neposílá, a to ani přes přesměrování.
+"""
+import html
+import ipaddress
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from domain_index import open_database
+from extraction import decode_content
+from fetcher import REQUEST_HEADERS
+from metrics import Counter
+
+# Nastavení ověřování (lze přepsat proměnnými prostředí)
+ENRICH_DB_FILE = os.environ.get('ENRICH_DB_FILE', os.path.join('results', 'enrichment.sqlite3'))
+ENRICH_TTL_HOURS = float(os.environ.get('ENRICH_TTL_HOURS', 72))
+ENRICH_WORKERS = int(os.environ.get('ENRICH_WORKERS', 32))
+ENRICH_TIMEOUT = float(os.environ.get('ENRICH_TIMEOUT', 5))
+# Z těla stránky se přečte nejvýš tolik bajtů - titulek a meta popis bývají v hlavičce
+ENRICH_MAX_BYTES = 64 * 1024
+ENRICH_CHUNK = 500
+ENRICH_MAX_REDIRECTS = 10
+MAX_TEXT_LENGTH = 300
+
+# Pole, která se připojují k výsledkům
+ENRICH_FIELDS = ('final_url', 'status', 'title', 'description', 'error', 'checked_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrichment (
+    url TEXT PRIMARY KEY,
+    final_url TEXT,
+    status INTEGER,
+    title TEXT,
+    description TEXT,
+    error TEXT,
+    checked_at TEXT NOT NULL
+);
+"""
+
+TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title', re.IGNORECASE | re.DOTALL)
+META_RE = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+HEAD_END_RE = re.compile(rb'</head\s*>|<body[\s>]', re.IGNORECASE)
+DESCRIPTION_NAMES = ('description', 'og:description', 'twitter:description')
+
+ENRICHED_TOTAL = Counter('scraper_enriched_total', 'Ověřené domény podle výsledku', ('result',))
+
+
+class BlockedAddressError(requests.RequestException):
+    """Hostitel se překládá na neveřejnou adresu"""
+
+
+def is_public_host(host):
+    """Všechny adresy hostitele jsou veřejné (nepřeložitelný hostitel nechá selhat až požadavek)"""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except (socket.gaierror, UnicodeError):
+        return True
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if getattr(address, 'ipv4_mapped', None):
+            address = address.ipv4_mapped
+        if not address.is_global:
+            return False
+    return True
+
+
+def clean_text(value):
+    """Odstraní entity a nadbytečné mezery, dlouhý text zkrátí"""
+    text = ' '.join(html.unescape(value).split())
+    return text[:MAX_TEXT_LENGTH] or None
+
+
+def parse_head(text):
+    """Titulek a meta popis ze začátku HTML stránky"""
+    match = TITLE_RE.search(text)
+    title = clean_text(match.group(1)) if match else None
+    description = None
+    for tag in META_RE.findall(text):
+        attrs = {name.lower(): double or single or bare for name, double, single, bare in ATTR_RE.findall(tag)}
+        if (attrs.get('name') or attrs.get('property', '')).lower() in DESCRIPTION_NAMES and attrs.get('content'):
+            description = clean_text(attrs['content'])
+            if description:
+                break
+    return title, description
+
+
+class Enricher:
+    """Hromadně ověřuje domény a pamatuje si výsledky v cache s TTL"""
+    def __init__(self, path=ENRICH_DB_FILE, workers=ENRICH_WORKERS, timeout=ENRICH_TIMEOUT):
+        self.path = path
+        self.workers = workers
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.db = open_database(path, SCHEMA)
+        # Každá doména je jiný hostitel - pool drží spojení aspoň pro všechny souběžné požadavky
+        self.session = requests.Session()
+        self.session.headers.update(REQUEST_HEADERS)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def lookup(self, urls):
+        """Uložené údaje k URL (bez ohledu na stáří) - url -> záznam"""
+        urls = list(urls)
+        records = {}
+        with self.lock:
+            for start in range(0, len(urls), ENRICH_CHUNK):
+                chunk = urls[start:start + ENRICH_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                for row in self.db.execute(
+                        f"SELECT url, {', '.join(ENRICH_FIELDS)} FROM enrichment WHERE url IN ({placeholders})", chunk):
+                    records[row[0]] = dict(zip(ENRICH_FIELDS, row[1:]))
+        return records
+
+    def fresh(self, urls, ttl_hours=ENRICH_TTL_HOURS):
+        """URL ověřené v posledních ttl_hours hodinách"""
+        cutoff = (datetime.now() - timedelta(hours=ttl_hours)).isoformat()
+        return {url for url, record in self.lookup(urls).items() if record['checked_at'] >= cutoff}
+
+    def save(self, records):
+        with self.lock, self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO enrichment (url, {', '.join(ENRICH_FIELDS)}) VALUES (?, {', '.join('?' * len(ENRICH_FIELDS))})",
+                [(record['url'],) + tuple(record[field] for field in ENRICH_FIELDS) for record in records])
+
+    def get(self, url):
+        """GET s ručně procházenými přesměrováními - každý cíl se nejdřív ověří, že je veřejný"""
+        for _ in range(ENRICH_MAX_REDIRECTS + 1):
+            if not is_public_host(urlparse(url).hostname or ''):
+                raise BlockedAddressError(f"Neveřejná adresa: {url}")
+            response = self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            response.close()
+            url = urljoin(response.url, response.headers['Location'])
+        raise requests.TooManyRedirects(f"Víc než {ENRICH_MAX_REDIRECTS} přesměrování: {url}")
+
+    def check(self, url):
+        """Jeden požadavek na doménu - stav, cílová URL a metadata z hlavičky stránky"""
+        record = dict.fromkeys(ENRICH_FIELDS)
+        record['url'] = url
+        try:
+            with self.get(url) as response:
+                record['final_url'] = response.url
+                record['status'] = response.status_code
+                if 'html' in response.headers.get('Content-Type', '').lower():
+                    body = b''
+                    for chunk in response.iter_content(16 * 1024):
+                        body += chunk
+                        if len(body) >= ENRICH_MAX_BYTES or HEAD_END_RE.search(body):
+                            break
+                    # Bez charsetu v hlavičce requests hádá ISO-8859-1 - většina webů je ale UTF-8
+                    encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else 'utf-8'
+                    record['title'], record['description'] = parse_head(decode_content(body[:ENRICH_MAX_BYTES], encoding))
+        except Exception as e:
+            # Chyba jedné domény (síť, nečitelná odpověď) se zapíše k jejímu záznamu, ověřování pokračuje
+            record['error'] = type(e).__name__
+        record['checked_at'] = datetime.now().isoformat()
+        if record['error']:
+            ENRICHED_TOTAL.inc('error')
+        else:
+            ENRICHED_TOTAL.inc('alive' if record['status'] < 400 else 'dead')
+        return record
+
+    def enrich(self, urls, total=None, cancel_event=None, progress=None, observe=None, ttl_hours=ENRICH_TTL_HOURS):
+        """Ověří URL po blocích, čerstvě ověřené přeskočí. Vrací (ověřeno, přeskočeno)
+
+        progress(hotovo, celkem) se volá po každém bloku, observe(fáze, sekundy) dostane čas ověření.
+        """
+        urls = iter(urls)
+        checked = skipped = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich") as executor:
+            while not (cancel_event is not None and cancel_event.is_set()):
+                chunk = list(dict.fromkeys(islice(urls, ENRICH_CHUNK)))
+                if not chunk:
+                    break
+                fresh = self.fresh(chunk, ttl_hours)
+                todo = [url for url in chunk if url not in fresh]
+                started = time.perf_counter()
+                records = list(executor.map(self.check, todo))
+                if observe and todo:
+                    observe('enrich', time.perf_counter() - started)
+                if records:
+                    self.save(records)
+                checked += len(todo)
+                skipped += len(fresh)
+                if progress:
+                    progress(checked + skipped, total)
+        return checked, skipped
+
+    def merge(self, results):
+        """Připojí uložené údaje k výsledkům (kopie záznamů, originál se nemění)"""
+        records = self.lookup(result['url'] for result in results)
+        return [dict(result, **records[result['url']]) if result['url'] in records else result for result in results]
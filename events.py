@@ -0,0 +1,64 @@
+"""Sběrnice událostí úloh v rámci procesu - zdroj pro Server-Sent Events"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+# Stavy, po kterých už žádná další událost nepřijde
+TERMINAL_STATUSES = ('completed', 'cancelled', 'error')
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class EventBus:
+    """Rozesílá události úloh všem odběratelům, poslední stav si pamatuje pro nové odběratele"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.last_status = {}
+
+    def publish(self, job_id, event, data):
+        with self.lock:
+            if event == 'status':
+                self.last_status[job_id] = data
+            subscribers = list(self.subscribers.get(job_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event, data))
+            except queue.Full:
+                # Pomalý odběratel - zahoď nejstarší událost, ať nebrzdí crawler
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait((event, data))
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def subscribe(self, job_id):
+        """Vrátí frontu událostí úlohy, na začátku s posledním známým stavem"""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers[job_id].add(subscriber)
+            if job_id in self.last_status:
+                subscriber.put_nowait(('status', self.last_status[job_id]))
+        return subscriber
+
+    def unsubscribe(self, job_id, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[job_id]
+
+    def get_status(self, job_id):
+        with self.lock:
+            return self.last_status.get(job_id)
+
+    def forget(self, job_id):
+        """Zapomene poslední stav dokončené úlohy (odběratelé dostanou stav ze souboru)"""
+        with self.lock:
+            self.last_status.pop(job_id, None)
+
+
+def format_sse(event, data):
+    """Zformátuje jednu událost pro text/event-stream"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
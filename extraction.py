@@ -0,0 +1,202 @@
+"""Hledání odkazů v obsahu stránky - regexy nad JSON/textem a odkazy <a href>
+
+Funkce pro parsování stránky nesahají na stav úlohy, takže mohou běžet
+v samostatných procesech (ProcessPoolExecutor). Koordinátorovi vrací jen
+kompaktní seznamy kandidátů, deduplikaci proti nalezeným doménám dělá on.
+"""
+import re
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from url_classifier import get_classifier, get_main_domain
+
+# URL v JSON datech (Next.js, API odpovědi vložené do stránky)
+JSON_URL_PATTERNS = [
+    re.compile(r'"websiteUrl":"(https?://[^"?]+)'),
+    re.compile(r'"url":"(https?://[^"?]+)'),
+    re.compile(r'"link":"(https?://[^"?]+)'),
+    re.compile(r'"href":"(https?://[^"?]+)')
+]
+# URL kdekoliv v textu (např. api.domain.com v skriptech)
+TEXT_URL_PATTERN = re.compile(r'https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(?:/[^\s"\'<>]*)?')
+
+# Kolik znaků na konci bufferu se nechá na další kus - delší URL mohou být rozdělené
+STREAM_OVERLAP = 4096
+
+
+def candidate_domains(urls, classifier, seen=None):
+    """Hlavní domény AI nástrojů z URL - v pořadí nalezení, každá jen jednou"""
+    if seen is None:
+        seen = set()
+    domains = []
+    for url, is_ai_tool in zip(urls, classifier.classify_many(urls)):
+        if is_ai_tool:
+            domain = get_main_domain(url)
+            if domain and domain not in seen:
+                seen.add(domain)
+                domains.append(domain)
+    return domains
+
+
+def find_content_urls(content):
+    """Shody všech regexů v obsahu - nejdřív URL z JSON dat, pak URL z textu"""
+    return [pattern.findall(content) for pattern in JSON_URL_PATTERNS + [TEXT_URL_PATTERN]]
+
+
+def content_candidates(url_groups, classifier):
+    """Hlavní domény AI nástrojů ze skupin URL z find_content_urls"""
+    seen = set()
+    domains = []
+    for urls in url_groups:
+        domains.extend(candidate_domains(urls, classifier, seen))
+    return domains
+
+
+def extract_content_candidates(content, classifier):
+    """Kandidáti z obsahu stránky - nejdřív URL z JSON dat, pak URL z textu"""
+    return content_candidates(find_content_urls(content), classifier)
+
+
+def split_links(url, hrefs, classifier, collect_subpages):
+    """Rozdělí odkazy na AI nástroje (hlavní domény) a podstránky stejné domény"""
+    tool_domains = []
+    seen_domains = set()
+    subpages = []
+    seen_subpages = set()
+    netloc = urlparse(url).netloc
+
+    # Převede relativní odkazy na absolutní
+    link_urls = [urljoin(url, href) for href in hrefs]
+    for full_url, is_ai_tool in zip(link_urls, classifier.classify_many(link_urls)):
+        if is_ai_tool:
+            domain = get_main_domain(full_url)
+            if domain and domain not in seen_domains:
+                seen_domains.add(domain)
+                tool_domains.append(domain)
+        elif collect_subpages:
+            if urlparse(full_url).netloc == netloc and full_url != url and full_url not in seen_subpages:
+                seen_subpages.add(full_url)
+                subpages.append(full_url)
+    return tool_domains, subpages
+
+
+def decode_content(content, encoding):
+    """Tělo stránky jako text - neznámé kódování (nesmyslný charset v hlavičce) nahradí UTF-8"""
+    try:
+        return content.decode(encoding or 'utf-8', errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+
+def parse_page(content, encoding, url, collect_subpages=True, max_links=None, rules=None):
+    """Rozparsuje stažené tělo stránky (běží i v jiném procesu)
+
+    Vrací čtveřici (domény_z_obsahu, domény_z_odkazů, podstránky, časy_fází).
+    rules je dvojice (ai_keywords, ignore_domains) pro klasifikátor.
+    """
+    if isinstance(content, bytes):
+        content = decode_content(content, encoding)
+    classifier = get_classifier(*rules) if rules else get_classifier()
+
+    started = time.perf_counter()
+    url_groups = find_content_urls(content)
+    extracted = time.perf_counter()
+    content_domains = content_candidates(url_groups, classifier)
+    classified = time.perf_counter()
+
+    soup = BeautifulSoup(content, 'html5lib')
+    hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+    if max_links is not None:
+        hrefs = hrefs[:max_links]
+    parsed = time.perf_counter()
+
+    tool_domains, subpages = split_links(url, hrefs, classifier, collect_subpages)
+    timings = {
+        'extract': extracted - started,
+        'classify': classified - extracted + time.perf_counter() - parsed,
+        'parse': parsed - classified
+    }
+    return content_domains, tool_domains, subpages, timings
+
+
+class HrefCollector(HTMLParser):
+    """Inkrementální tokenizér, který si pamatuje jen hodnoty <a href>"""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        for name, value in attrs:
+            if name == 'href':
+                self.hrefs.append(value or '')
+                return
+
+    def take(self):
+        hrefs, self.hrefs = self.hrefs, []
+        return hrefs
+
+
+class StreamingLinkExtractor:
+    """Hledá odkazy v textu přicházejícím po částech, paměť drží jen malé okno
+
+    feed() a close() vrací dvojici (url_z_obsahu, hrefs). URL z obsahu jsou
+    shody JSON regexů a textového regexu, hrefs hodnoty <a href> v pořadí
+    výskytu. Shoda, která se dotýká konce bufferu, se odloží na další kus.
+    """
+    def __init__(self):
+        self.patterns = JSON_URL_PATTERNS + [TEXT_URL_PATTERN]
+        self.buffer = ''
+        # Absolutní pozice začátku bufferu a pozice, odkud pokračuje každý regex
+        self.offset = 0
+        self.positions = [0] * len(self.patterns)
+        self.html = HrefCollector()
+        # Čas strávený HTML tokenizérem a regexy (pro metriky)
+        self.timings = {'parse': 0.0, 'extract': 0.0}
+
+    def feed(self, chunk):
+        started = time.perf_counter()
+        self.html.feed(chunk)
+        parsed = time.perf_counter()
+        self.buffer += chunk
+        urls = self.scan(final=False)
+        self.timings['parse'] += parsed - started
+        self.timings['extract'] += time.perf_counter() - parsed
+        return urls, self.html.take()
+
+    def close(self):
+        started = time.perf_counter()
+        self.html.close()
+        parsed = time.perf_counter()
+        urls = self.scan(final=True)
+        self.timings['parse'] += parsed - started
+        self.timings['extract'] += time.perf_counter() - parsed
+        return urls, self.html.take()
+
+    def scan(self, final):
+        urls = []
+        end = len(self.buffer)
+        limit = end if final else end - STREAM_OVERLAP
+
+        for i, pattern in enumerate(self.patterns):
+            pos = self.positions[i] - self.offset
+            next_pos = max(pos, limit)
+            for match in pattern.finditer(self.buffer, pos):
+                # Shoda na konci bufferu může pokračovat v dalším kusu
+                if not final and (match.end() >= end or match.start() >= limit):
+                    next_pos = min(match.start(), next_pos)
+                    break
+                urls.append(match.group(match.lastindex or 0))
+                next_pos = max(match.end(), limit)
+            self.positions[i] = self.offset + next_pos
+
+        # Zahoď zpracovaný začátek bufferu
+        cut = min(self.positions) - self.offset
+        if cut > 0:
+            self.buffer = self.buffer[cut:]
+            self.offset += cut
+        return urls
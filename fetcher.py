@@ -0,0 +1,273 @@
+"""Sdílená vrstva pro stahování stránek - pool spojení a HTTP cache na disku"""
+import codecs
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Nastavení fetcheru (lze přepsat proměnnými prostředí)
+HTTP_CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', os.path.join('cache', 'http'))
+HTTP_CACHE_MAX_MB = int(os.environ.get('HTTP_CACHE_MAX_MB', 512))
+HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', 32))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 16))
+HTTP_TIMEOUT = 10
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 64 * 1024))
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class FetchResult:
+    """Výsledek stažení stránky (ze sítě nebo z cache)"""
+    def __init__(self, url, status_code, content, encoding, headers, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers
+        self.from_cache = from_cache
+
+
+class HTTPCache:
+    """HTTP cache na disku - klíčem je URL, velikost hlídá LRU evikce"""
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # key -> velikost souboru, pořadí odpovídá poslednímu použití
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self.load_index()
+
+    def load_index(self):
+        """Načte existující záznamy seřazené podle posledního použití (mtime)"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.cache'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len('.cache')], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def key_for(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.cache")
+
+    def get(self, url):
+        """Vrátí (metadata, tělo) uložené odpovědi nebo None"""
+        key = self.key_for(url)
+        with self.lock:
+            if key not in self.entries:
+                return None
+        try:
+            with open(self.path_for(key), 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            self.discard(key)
+            return None
+        if meta.get('url') != url:
+            return None
+        return meta, body
+
+    def touch(self, url):
+        """Označí záznam jako nedávno použitý"""
+        key = self.key_for(url)
+        with self.lock:
+            if key not in self.entries:
+                return
+            self.entries.move_to_end(key)
+        try:
+            os.utime(self.path_for(key))
+        except OSError:
+            pass
+
+    def put(self, url, meta, body):
+        """Uloží odpověď do cache a případně vyhodí nejdéle nepoužité záznamy"""
+        writer = self.open_writer(url, meta)
+        writer.write(body)
+        writer.commit()
+
+    def open_writer(self, url, meta):
+        """Zápis odpovědi po částech - pro proudové stahování"""
+        return CacheWriter(self, url, meta)
+
+    def commit(self, key, tmp_path, size):
+        """Nahradí záznam dopsaným dočasným souborem a hlídá limit velikosti"""
+        os.replace(tmp_path, self.path_for(key))
+
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            evicted = []
+            while self.total_bytes > self.max_bytes and self.entries:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self.path_for(old_key))
+            except OSError:
+                pass
+
+    def discard(self, key):
+        with self.lock:
+            self.total_bytes -= self.entries.pop(key, 0)
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            pass
+
+
+class CacheWriter:
+    """Postupně zapisuje odpověď do dočasného souboru, do cache ji vloží až commit()"""
+    def __init__(self, cache, url, meta):
+        self.cache = cache
+        self.key = cache.key_for(url)
+        self.tmp_path = f"{cache.path_for(self.key)}.{threading.get_ident()}.tmp"
+        self.handle = open(self.tmp_path, 'wb')
+        self.size = 0
+        self.write(json.dumps(dict(meta, url=url), ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def write(self, data):
+        if self.handle is None:
+            return
+        self.size += len(data)
+        # Odpověď větší než celá cache se neukládá
+        if self.size > self.cache.max_bytes:
+            self.abort()
+            return
+        self.handle.write(data)
+
+    def commit(self):
+        if self.handle is None:
+            return
+        self.handle.close()
+        self.handle = None
+        self.cache.commit(self.key, self.tmp_path, self.size)
+
+    def abort(self):
+        if self.handle is None:
+            return
+        self.handle.close()
+        self.handle = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class Fetcher:
+    """Stahuje stránky přes sdílenou session s keep-alive spojeními a podmíněnými požadavky"""
+    def __init__(self, cache=None, timeout=HTTP_TIMEOUT):
+        self.cache = cache
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(REQUEST_HEADERS)
+        # Pool spojení pro každého hostitele - keep-alive mezi požadavky i úlohami
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def conditional_headers(self, cached):
+        """Hlavičky pro podmíněný požadavek podle uložené odpovědi"""
+        headers = {}
+        if cached:
+            meta = cached[0]
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def cache_meta(self, response, encoding):
+        return {
+            'final_url': response.url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': encoding
+        }
+
+    def fetch(self, url):
+        """Stáhne URL, u známých stránek se zeptá serveru, zda se změnily"""
+        cached = self.cache.get(url) if self.cache else None
+        headers = self.conditional_headers(cached)
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        # 304 - stránka se nezměnila, použij tělo z cache
+        if response.status_code == 304 and cached:
+            meta, body = cached
+            self.cache.touch(url)
+            return FetchResult(meta.get('final_url', url), 200, body, meta.get('encoding'), response.headers, from_cache=True)
+
+        response.raise_for_status()
+        content = response.content  # gzip/deflate/brotli dekóduje urllib3
+        encoding = response.encoding or response.apparent_encoding
+
+        if self.cache and self.is_cacheable(response):
+            self.cache.put(url, self.cache_meta(response, encoding), content)
+
+        return FetchResult(response.url, response.status_code, content, encoding, response.headers)
+
+    def iter_text(self, url, chunk_size=STREAM_CHUNK_SIZE):
+        """Stáhne URL proudově a vrací dekódovaný text po částech (tělo se nedrží celé v paměti)"""
+        cached = self.cache.get(url) if self.cache else None
+        headers = self.conditional_headers(cached)
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cached:
+                meta, body = cached
+                self.cache.touch(url)
+                decoder = self.make_decoder(meta.get('encoding'))
+                for start in range(0, len(body), chunk_size):
+                    text = decoder.decode(body[start:start + chunk_size])
+                    if text:
+                        yield text
+                yield decoder.decode(b'', final=True)
+                return
+
+            response.raise_for_status()
+            # Bez celého těla nejde odhadnout kódování, výchozí je UTF-8
+            encoding = response.encoding or 'utf-8'
+            decoder = self.make_decoder(encoding)
+            writer = None
+            if self.cache and self.is_cacheable(response):
+                writer = self.cache.open_writer(url, self.cache_meta(response, encoding))
+            try:
+                for raw in response.iter_content(chunk_size):
+                    if writer:
+                        writer.write(raw)
+                    text = decoder.decode(raw)
+                    if text:
+                        yield text
+                yield decoder.decode(b'', final=True)
+                if writer:
+                    writer.commit()
+            finally:
+                # Nedočtená odpověď (předčasné ukončení, chyba) se do cache nedostane
+                if writer:
+                    writer.abort()
+
+    def make_decoder(self, encoding):
+        try:
+            return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def is_cacheable(self, response):
+        """Ukládá jen odpovědi, které jde později ověřit podmíněným požadavkem"""
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return False
+        return bool(response.headers.get('ETag') or response.headers.get('Last-Modified'))
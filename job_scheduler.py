@@ -0,0 +1,156 @@
+"""Plánovač scraping úloh - pevný počet workerů nad omezenou prioritní frontou"""
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from log_setup import get_logger
+
+# Nastavení plánovače (lze přepsat proměnnými prostředí)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 100))
+# Jak dlouho (s) zůstane dokončená úloha v paměti, pak se čte už jen ze souboru
+FINISHED_JOB_TTL = int(os.environ.get('FINISHED_JOB_TTL', 600))
+
+
+log = get_logger('scheduler')
+
+
+class QueueFullError(Exception):
+    """Fronta úloh je plná - nová úloha se nepřijme"""
+
+
+class JobScheduler:
+    """Spouští úlohy na pevném poolu vláken, čekající úlohy drží v prioritní frontě"""
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, finished_ttl=FINISHED_JOB_TTL, on_evict=None):
+        self.workers = workers
+        self.finished_ttl = finished_ttl
+        self.on_evict = on_evict
+        self.queue = queue.PriorityQueue(maxsize=max_queued)
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        # queued: job_id -> (pořadí záznamu ve frontě, funkce pro zrušení) - čeká ve frontě
+        # running: job_id -> funkce pro zrušení - běží
+        self.queued = {}
+        self.running = {}
+        self.finished = deque()
+        self.threads = []
+
+    def start(self):
+        """Spustí worker vlákna (jen jednou)"""
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self.worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, job_id, run, cancel, priority=0):
+        """Zařadí úlohu do fronty. Vyšší priorita se spustí dřív, při shodě rozhoduje pořadí"""
+        self.start()
+        self.evict_finished()
+        sequence = next(self.sequence)
+        with self.lock:
+            # Pořadí odliší tento záznam od dřívějšího zrušeného záznamu se stejným job_id
+            self.queued[job_id] = (sequence, cancel)
+            # Znovu spuštěná (obnovená) úloha už nesmí být uvolněna jako dokončená
+            self.finished = deque(item for item in self.finished if item[1] != job_id)
+        try:
+            self.queue.put_nowait((-priority, sequence, job_id, run))
+        except queue.Full:
+            with self.lock:
+                if self.queued.get(job_id, (None,))[0] == sequence:
+                    del self.queued[job_id]
+            raise QueueFullError(f"Fronta úloh je plná ({self.queue.maxsize})")
+
+    def cancel(self, job_id):
+        """Zruší úlohu - čekající se vůbec nespustí, běžící se zastaví po rozpracovaných stránkách"""
+        with self.lock:
+            entry = self.queued.pop(job_id, None)
+            cancel = entry[1] if entry else self.running.get(job_id)
+            if entry:
+                # Zrušená čekající úloha se už nespustí - z paměti se uvolní jako dokončená
+                self.finished.append((time.monotonic(), job_id))
+        if cancel is None:
+            return False
+        if entry:
+            self.discard(entry[0])
+        cancel()
+        return True
+
+    def discard(self, sequence):
+        """Odebere zrušený záznam z fronty, aby nezabíral místo do maxsize"""
+        with self.queue.mutex:
+            items = self.queue.queue
+            for index, item in enumerate(items):
+                if item[1] == sequence:
+                    items.pop(index)
+                    heapq.heapify(items)
+                    self.queue.unfinished_tasks -= 1
+                    self.queue.not_full.notify()
+                    return
+
+    def is_active(self, job_id):
+        """Čeká úloha ve frontě nebo právě běží?"""
+        with self.lock:
+            return job_id in self.queued or job_id in self.running
+
+    def counts(self):
+        """Počet čekajících a běžících úloh"""
+        with self.lock:
+            return {'queued': len(self.queued), 'running': len(self.running)}
+
+    def queue_position(self, job_id):
+        """Pořadí úlohy ve frontě (1 = další na řadě), None když ve frontě není"""
+        with self.lock:
+            if job_id not in self.queued:
+                return None
+        pending = sorted(item[:3] for item in list(self.queue.queue))
+        for position, item in enumerate(pending, 1):
+            if item[2] == job_id:
+                return position
+        return None
+
+    def worker_loop(self):
+        while True:
+            try:
+                _, sequence, job_id, run = self.queue.get(timeout=30)
+            except queue.Empty:
+                self.evict_finished()
+                continue
+
+            with self.lock:
+                entry = self.queued.get(job_id)
+                # Zrušený záznam (úloha mezitím mohla být zařazena znovu s jiným pořadím) - přeskoč ho
+                if entry is None or entry[0] != sequence:
+                    self.queue.task_done()
+                    continue
+                del self.queued[job_id]
+                cancel = entry[1]
+                self.running[job_id] = cancel
+
+            try:
+                run()
+            except Exception as e:
+                log.exception("⚠️  Úloha %s skončila výjimkou: %s", job_id, e)
+            finally:
+                with self.lock:
+                    self.running.pop(job_id, None)
+                    self.finished.append((time.monotonic(), job_id))
+                self.queue.task_done()
+                self.evict_finished()
+
+    def evict_finished(self):
+        """Uvolní z paměti úlohy dokončené před více než finished_ttl sekundami"""
+        expired = []
+        now = time.monotonic()
+        with self.lock:
+            while self.finished and now - self.finished[0][0] >= self.finished_ttl:
+                expired.append(self.finished.popleft()[1])
+        if self.on_evict:
+            for job_id in expired:
+                self.on_evict(job_id)
@@ -0,0 +1,55 @@
+"""Nastavení logování - úroveň a formát (text/JSON) z proměnných prostředí"""
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# text = čitelné řádky, json = jeden JSON objekt na řádek (pro sběr logů)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(job_id)s] %(message)s'
+
+
+class JobContextFilter(logging.Filter):
+    """Doplní job_id záznamům, které nepřišly přes logger úlohy"""
+    def filter(self, record):
+        if not hasattr(record, 'job_id'):
+            record.job_id = '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'job_id': record.job_id,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT):
+    """Nastaví logger "scraper" (jen jednou, další volání nic nedělají)"""
+    logger = logging.getLogger('scraper')
+    if logger.handlers:
+        return logger
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(JobContextFilter())
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+
+def get_logger(name, job_id=None):
+    """Logger pod "scraper"; s job_id přidá ID úlohy ke každému záznamu"""
+    logger = logging.getLogger(f'scraper.{name}')
+    if job_id is None:
+        return logger
+    return logging.LoggerAdapter(logger, {'job_id': job_id})
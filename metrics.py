@@ -0,0 +1,234 @@
+"""Metriky crawleru - čítače a histogramy časů jednotlivých fází, export pro /metrics (Prometheus)"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Fáze zpracování stránky a ověření domén po crawlu (enrich), jejichž čas se měří
+STAGES = ('throttle', 'fetch', 'extract', 'parse', 'classify', 'persist', 'enrich')
+# Hranice histogramů v sekundách
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Seznam metrik, které se vypisují na /metrics"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Textový formát pro Prometheus (text/plain; version=0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    """Monotónně rostoucí čítač, volitelně s labely"""
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        registry.register(self)
+
+    def inc(self, *labelvalues, amount=1):
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+    def render(self):
+        with self.lock:
+            values = list(self.values.items())
+        return [f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}" for labels, value in values]
+
+
+class Histogram:
+    """Rozložení hodnot do košů - počty se kumulují až při výpisu"""
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # labely -> [počty v koších (poslední = +Inf), součet, počet]
+        self.series = {}
+        registry.register(self)
+
+    def observe(self, value, *labelvalues):
+        with self.lock:
+            series = self.series.get(labelvalues)
+            if series is None:
+                series = self.series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self.lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self.series.items()]
+        lines = []
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, ('le', format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """Hodnoty se zjistí až při výpisu - fn vrací slovník labely -> hodnota"""
+    def __init__(self, name, help, type, labelnames, fn, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        registry.register(self)
+
+    def render(self):
+        return [f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}" for labels, value in self.fn().items()]
+
+
+STAGE_SECONDS = Histogram('scraper_stage_seconds', 'Čas jedné fáze zpracování stránky', ('stage',))
+PAGE_SECONDS = Histogram('scraper_page_seconds', 'Celkový čas zpracování stránky od stažení po uložení')
+PAGES_TOTAL = Counter('scraper_pages_total', 'Zpracované stránky podle výsledku', ('result',))
+URLS_SAVED_TOTAL = Counter('scraper_urls_saved_total', 'Nově uložené URL AI nástrojů')
+
+# Metriky běžících úloh - po uvolnění úlohy z paměti zmizí i z /metrics
+live_jobs = {}
+live_jobs_lock = threading.Lock()
+
+
+class JobMetrics:
+    """Časy fází a počty stránek jedné úlohy - zároveň plní globální histogramy"""
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.lock = threading.Lock()
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.stage_count = dict.fromkeys(STAGES, 0)
+        self.pages = 0
+        self.page_errors = 0
+        self.page_seconds = 0.0
+        self.urls_saved = 0
+        self.started = time.time()
+        with live_jobs_lock:
+            live_jobs[job_id] = self
+
+    def observe(self, stage, seconds):
+        STAGE_SECONDS.observe(seconds, stage)
+        with self.lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_count[stage] += 1
+
+    def observe_many(self, timings):
+        """Časy fází naměřené jinde (např. v procesu pro parsování)"""
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def page_done(self, seconds, error=False):
+        PAGE_SECONDS.observe(seconds)
+        PAGES_TOTAL.inc('error' if error else 'ok')
+        with self.lock:
+            self.pages += 1
+            self.page_seconds += seconds
+            if error:
+                self.page_errors += 1
+
+    def add_saved(self, count):
+        URLS_SAVED_TOTAL.inc(amount=count)
+        with self.lock:
+            self.urls_saved += count
+
+    def snapshot(self):
+        """Souhrn pro /metrics/<job_id> - celkové a průměrné časy fází"""
+        with self.lock:
+            return {
+                'job_id': self.job_id,
+                'started': self.started,
+                'elapsed_seconds': round(time.time() - self.started, 3),
+                'pages': self.pages,
+                'page_errors': self.page_errors,
+                'page_mean_ms': round(self.page_seconds / self.pages * 1000, 2) if self.pages else 0.0,
+                'urls_saved': self.urls_saved,
+                'stages': {
+                    stage: {
+                        'count': self.stage_count[stage],
+                        'total_seconds': round(self.stage_seconds[stage], 4),
+                        'mean_ms': round(self.stage_seconds[stage] / self.stage_count[stage] * 1000, 3) if self.stage_count[stage] else 0.0
+                    } for stage in STAGES
+                }
+            }
+
+
+def get_job_metrics(job_id):
+    with live_jobs_lock:
+        return live_jobs.get(job_id)
+
+
+def forget_job(job_id):
+    with live_jobs_lock:
+        live_jobs.pop(job_id, None)
+
+
+def live_job_values(field):
+    with live_jobs_lock:
+        jobs = list(live_jobs.values())
+    values = {}
+    for job in jobs:
+        with job.lock:
+            if field == 'stage_seconds':
+                for stage, seconds in job.stage_seconds.items():
+                    values[(job.job_id, stage)] = seconds
+            else:
+                values[(job.job_id,)] = getattr(job, field)
+    return values
+
+
+CallbackMetric('scraper_job_stage_seconds_total', 'Součet časů fází podle úlohy (jen úlohy v paměti)', 'counter',
+               ('job_id', 'stage'), lambda: live_job_values('stage_seconds'))
+CallbackMetric('scraper_job_pages_total', 'Zpracované stránky podle úlohy (jen úlohy v paměti)', 'counter',
+               ('job_id',), lambda: live_job_values('pages'))
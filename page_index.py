@@ -0,0 +1,151 @@
+"""Index navštívených stránek pro opakované crawly (SQLite)
+
+Ke každé URL si pamatuje otisk těla, výsledek extrakce (domény z obsahu,
+domény z odkazů, podstránky), kdy byla naposledy stažená a kolikrát se
+změnila. Opakovaný crawl díky tomu:
+- u stejného těla přeskočí regexy i parsování a použije uloženou extrakci
+- s max_age vůbec nestahuje stránky stažené před méně než max_age hodinami
+- ve frontě dá přednost stránkám, které se často mění
+Extrakce závisí i na parametrech parsování (podstránky, limit odkazů, pravidla
+klasifikátoru) - ukládá se proto s otiskem těchto parametrů (variant).
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from domain_index import open_database
+from metrics import Counter
+
+PAGE_INDEX_FILE = os.environ.get('PAGE_INDEX_FILE', os.path.join('results', 'page_index.sqlite3'))
+# 0 = index stránek se nepoužívá
+PAGE_INDEX_ENABLED = os.environ.get('PAGE_INDEX', '1') == '1'
+# Záznamy se do DB zapisují po dávkách
+FLUSH_BATCH = 100
+QUERY_CHUNK = 500
+# Priorita stránky, o které index ještě nic neví
+UNKNOWN_CHANGE_RATE = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    extraction TEXT NOT NULL,
+    last_crawled TEXT NOT NULL,
+    last_changed TEXT NOT NULL,
+    crawl_count INTEGER NOT NULL,
+    change_count INTEGER NOT NULL
+);
+"""
+
+# Počet změn se nezvýší, když se tělo nezměnilo (SQLite v SET čte původní hodnoty řádku)
+UPSERT = """
+INSERT INTO pages (url, content_hash, variant, extraction, last_crawled, last_changed, crawl_count, change_count)
+VALUES (?, ?, ?, ?, ?, ?, 1, 0)
+ON CONFLICT(url) DO UPDATE SET
+    change_count = change_count + (content_hash != excluded.content_hash),
+    last_changed = CASE WHEN content_hash != excluded.content_hash THEN excluded.last_crawled ELSE last_changed END,
+    crawl_count = crawl_count + 1,
+    content_hash = excluded.content_hash,
+    variant = excluded.variant,
+    extraction = excluded.extraction,
+    last_crawled = excluded.last_crawled
+"""
+
+PAGES_REUSED_TOTAL = Counter('scraper_pages_reused_total', 'Stránky s extrakcí převzatou z indexu stránek', ('reason',))
+
+
+def content_hash(content):
+    """Otisk staženého těla stránky"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class PageIndex:
+    """Otisky a výsledky extrakce navštívených stránek napříč úlohami"""
+    def __init__(self, path=PAGE_INDEX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = open_database(path, SCHEMA)
+        self.pending = []
+        self.variants = {}
+
+    def variant(self, options):
+        """Otisk parametrů parsování - pravidla klasifikátoru jsou dlouhá, proto se pamatuje"""
+        variant = self.variants.get(options)
+        if variant is None:
+            variant = self.variants[options] = hashlib.blake2b(repr(options).encode('utf-8'), digest_size=8).hexdigest()
+        return variant
+
+    def row(self, url):
+        with self.lock:
+            return self.db.execute(
+                "SELECT content_hash, variant, extraction, last_crawled FROM pages WHERE url = ?", (url,)).fetchone()
+
+    def fresh(self, url, variant, max_age_hours):
+        """Uložená extrakce stránky stažené před méně než max_age_hours hodinami, jinak None"""
+        row = self.row(url)
+        if row is None or row[1] != variant:
+            return None
+        if row[3] < (datetime.now() - timedelta(hours=max_age_hours)).isoformat():
+            return None
+        PAGES_REUSED_TOTAL.inc('fresh')
+        return self.parsed(row[2])
+
+    def unchanged(self, url, page_hash, variant):
+        """Uložená extrakce, pokud má stránka stejné tělo jako minule, jinak None"""
+        row = self.row(url)
+        if row is None or row[0] != page_hash or row[1] != variant:
+            return None
+        PAGES_REUSED_TOTAL.inc('unchanged')
+        return self.parsed(row[2])
+
+    def parsed(self, extraction):
+        """Uložená extrakce ve tvaru výstupu parse_page (bez časů fází - nic se neměřilo)"""
+        content_domains, tool_domains, subpages = json.loads(extraction)
+        return content_domains, tool_domains, subpages, {}
+
+    def record(self, url, page_hash, variant, parsed):
+        """Zapamatuje si stažení stránky a výsledek extrakce (zapisuje se po dávkách)"""
+        content_domains, tool_domains, subpages = parsed[:3]
+        now = datetime.now().isoformat()
+        extraction = json.dumps([list(content_domains), list(tool_domains), list(subpages)], ensure_ascii=False)
+        with self.lock:
+            self.pending.append((url, page_hash, variant, extraction, now, now))
+            if len(self.pending) >= FLUSH_BATCH:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        if not self.pending:
+            return
+        with self.db:
+            self.db.executemany(UPSERT, self.pending)
+        self.pending = []
+
+    def change_rates(self, urls):
+        """Jak často se stránky mění (změny / stažení) - neznámé stránky mají UNKNOWN_CHANGE_RATE"""
+        urls = list(urls)
+        rates = dict.fromkeys(urls, UNKNOWN_CHANGE_RATE)
+        with self.lock:
+            for start in range(0, len(urls), QUERY_CHUNK):
+                chunk = urls[start:start + QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                for url, crawl_count, change_count in self.db.execute(
+                        f"SELECT url, crawl_count, change_count FROM pages WHERE url IN ({placeholders})", chunk):
+                    # První stažení se počítá jako změna - stránka viděná jednou má prioritu jako neznámá
+                    rates[url] = (change_count + 1) / (crawl_count + 1)
+        return rates
+
+    def stats(self):
+        with self.lock:
+            self.flush_locked()
+            pages, crawls, changes = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(crawl_count), 0), COALESCE(SUM(change_count), 0) FROM pages").fetchone()
+        return {'pages': pages, 'crawls': crawls, 'changes': changes}
@@ -0,0 +1,77 @@
+"""Vzorkovací profiler úlohy - periodicky čte zásobníky jejích vláken a počítá výskyty
+
+Na rozdíl od cProfile (měří jen vlákno, ve kterém běží) vidí všechna vlákna
+úlohy, tj. i stahovací workery. Výsledek je ve formátu "folded stacks",
+který umí načíst flamegraph.pl nebo speedscope.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+
+from results_store import RESULTS_DIR
+
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+PROFILE_MAX_DEPTH = 64
+
+
+def profile_path(job_id, results_dir=RESULTS_DIR):
+    return os.path.join(results_dir, f"{job_id}_profile.folded")
+
+
+class SamplingProfiler:
+    """Vzorkuje vlákna, jejichž jméno začíná některým z prefixů, a vlákna přidaná přes add_thread"""
+    def __init__(self, thread_prefixes=(), interval=PROFILE_INTERVAL):
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.interval = interval
+        self.thread_ids = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add_thread(self, ident=None):
+        self.thread_ids.add(ident or threading.get_ident())
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, '')
+                if ident in self.thread_ids or (self.thread_prefixes and name.startswith(self.thread_prefixes)):
+                    self.stacks[self.fold(name, frame)] += 1
+            self.samples += 1
+
+    def fold(self, thread_name, frame):
+        """Zásobník jako "vlákno;funkce (soubor:řádek);..." od nejvyššího rámce"""
+        frames = []
+        while frame is not None and len(frames) < PROFILE_MAX_DEPTH:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        # Worker vlákna poolu mají číslo na konci - sloučí se do jednoho kořene
+        root = thread_name.rstrip('0123456789').rstrip('_-') or 'thread'
+        return ';'.join([root] + frames[::-1])
+
+    def save(self, path):
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_file, path)
+
+    def top_functions(self, limit=10):
+        """Funkce s nejvíce vzorky na vrcholu zásobníku (vlastní čas)"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(limit)
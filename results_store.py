@@ -0,0 +1,266 @@
+"""Append-only úložiště výsledků úlohy ve formátu JSON Lines
+
+Vedle logu {job_id}_results.jsonl se vede index {job_id}_results.idx -
+pole uint64 (little-endian) s bajtovým offsetem začátku každého řádku.
+Stránka výsledků se pak čte seekem na offset místo procházení celého logu.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from itertools import islice
+
+from dedup import FingerprintSet, make_dedup_set
+
+RESULTS_DIR = "results"
+# fsync se dělá po dávkách - po N záznamech nebo po uplynutí intervalu
+FSYNC_BATCH = int(os.environ.get('RESULTS_FSYNC_BATCH', 100))
+FSYNC_INTERVAL = float(os.environ.get('RESULTS_FSYNC_INTERVAL', 1.0))
+
+
+def log_path(job_id, results_dir=RESULTS_DIR):
+    return os.path.join(results_dir, f"{job_id}_results.jsonl")
+
+
+def index_path(job_id, results_dir=RESULTS_DIR):
+    return os.path.join(results_dir, f"{job_id}_results.idx")
+
+
+def legacy_path(job_id, results_dir=RESULTS_DIR):
+    """Starší úlohy ukládaly výsledky jako jedno JSON pole"""
+    return os.path.join(results_dir, f"{job_id}_results.json")
+
+
+def results_exist(job_id, results_dir=RESULTS_DIR):
+    return os.path.exists(log_path(job_id, results_dir)) or os.path.exists(legacy_path(job_id, results_dir))
+
+
+def iter_log(path):
+    """Projde log po řádcích, poškozený (nedopsaný) konec přeskočí"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_results(job_id, results_dir=RESULTS_DIR):
+    """Postupně vrací výsledky úlohy bez načtení celého seznamu do paměti"""
+    legacy_file = legacy_path(job_id, results_dir)
+    if os.path.exists(legacy_file):
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+    log_file = log_path(job_id, results_dir)
+    if os.path.exists(log_file):
+        yield from iter_log(log_file)
+
+
+def line_offsets(path):
+    """Offsety začátků kompletních řádků logu (nedopsaný konec se nepočítá)"""
+    offsets = array('Q')
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offsets.append(offset)
+            offset += len(line)
+    return offsets
+
+
+def write_index(path, offsets):
+    """Atomicky zapíše index offsetů"""
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(offsets.tobytes())
+    os.replace(tmp_file, path)
+
+
+def read_page(job_id, start, count, results_dir=RESULTS_DIR):
+    """Stránka výsledků přes index offsetů - vrací (výsledky, celkem)
+
+    Úlohy se starým JSON snapshotem nebo bez logu vrací None (čtou se postupně
+    přes iter_results). Chybějící index dokončené úlohy se postaví při prvním čtení.
+    """
+    log_file = log_path(job_id, results_dir)
+    idx_file = index_path(job_id, results_dir)
+    if os.path.exists(legacy_path(job_id, results_dir)) or not os.path.exists(log_file):
+        return None
+    if not os.path.exists(idx_file):
+        write_index(idx_file, line_offsets(log_file))
+
+    with open(idx_file, 'rb') as f:
+        total = os.fstat(f.fileno()).st_size // 8
+        if start >= total or count <= 0:
+            return [], total
+        f.seek(start * 8)
+        first = array('Q')
+        first.frombytes(f.read(8))
+
+    # Záznamy jdou v logu za sebou - stačí seek na první a číst dál řádek po řádku
+    results = []
+    with open(log_file, 'rb') as f:
+        f.seek(first[0])
+        for line in islice(f, min(count, total - start)):
+            if not line.endswith(b'\n'):
+                break
+            results.append(json.loads(line))
+    return results, total
+
+
+class ResultsStore:
+    """Výsledky jedné úlohy - nové URL se jen připisují na konec logu"""
+    def __init__(self, job_id, results_dir=RESULTS_DIR):
+        self.job_id = job_id
+        self.results_dir = results_dir
+        self.log_file = log_path(job_id, results_dir)
+        self.index_file = index_path(job_id, results_dir)
+        self.legacy_file = legacy_path(job_id, results_dir)
+        self.lock = threading.Lock()
+        # Uložené URL jako kompaktní otisky (viz DEDUP_MODE)
+        self.urls = make_dedup_set()
+        self.count = 0
+        self.handle = None
+        self.index_handle = None
+        # Velikost logu v bajtech = offset dalšího záznamu
+        self.log_size = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def recover(self, seen=None):
+        """Obnoví stav z disku - načte starý snapshot i log a odřízne nedopsaný konec
+
+        Obnovené URL se přidají i do seen (dedup množina úlohy). Vrací počet výsledků.
+        """
+        if os.path.exists(self.legacy_file):
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                for result in json.load(f):
+                    self.remember(result, seen)
+
+        offsets = array('Q')
+        if os.path.exists(self.log_file):
+            good_offset = 0
+            with open(self.log_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        break
+                    self.remember(result, seen)
+                    offsets.append(good_offset)
+                    good_offset += len(line)
+            # Zahoď rozepsaný záznam po pádu, aby další zápis začal na novém řádku
+            if good_offset < os.path.getsize(self.log_file):
+                with open(self.log_file, 'r+b') as f:
+                    f.truncate(good_offset)
+            self.log_size = good_offset
+
+        # Index po pádu nemusí odpovídat logu - přepiš ho, pokud se liší
+        existing = b''
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'rb') as f:
+                existing = f.read()
+        if existing != offsets.tobytes():
+            write_index(self.index_file, offsets)
+        return self.count
+
+    def remember(self, result, seen=None):
+        url = result.get('url')
+        if url and self.urls.add(url):
+            self.count += 1
+            if seen is not None:
+                seen.add(url)
+
+    def append(self, urls, seed=None):
+        """Připíše URL, které ještě nejsou uložené. Vrací seznam skutečně nových
+
+        seed je výchozí web, přes který byly URL nalezeny (u dávkových úloh).
+        """
+        with self.lock:
+            new_urls = []
+            lines = []
+            for url in urls:
+                if not self.urls.add(url):
+                    continue
+                new_urls.append(url)
+                result = {
+                    "url": url,
+                    "found_at": datetime.now().isoformat()
+                }
+                if seed is not None:
+                    result["seed"] = seed
+                lines.append((json.dumps(result, ensure_ascii=False) + "\n").encode('utf-8'))
+
+            if lines:
+                if self.handle is None:
+                    self.handle = open(self.log_file, 'ab')
+                    self.index_handle = open(self.index_file, 'ab')
+                    self.log_size = self.handle.tell()
+                offsets = array('Q')
+                for line in lines:
+                    offsets.append(self.log_size)
+                    self.log_size += len(line)
+                # Index až po zápisu logu - nikdy neukazuje za konec zapsaných dat
+                self.handle.write(b''.join(lines))
+                self.handle.flush()
+                self.index_handle.write(offsets.tobytes())
+                self.index_handle.flush()
+                self.count += len(lines)
+                self.unsynced += len(lines)
+                if self.unsynced >= FSYNC_BATCH or time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+                    self.sync_locked()
+            return new_urls
+
+    def sync(self):
+        with self.lock:
+            self.sync_locked()
+
+    def sync_locked(self):
+        if self.handle is not None and self.unsynced:
+            os.fsync(self.handle.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def compact(self):
+        """Přepíše log do čistého snapshotu bez duplicit (atomicky přes dočasný soubor)"""
+        with self.lock:
+            self.close_locked()
+            tmp_file = f"{self.log_file}.tmp"
+            seen = FingerprintSet(self.count)
+            offsets = array('Q')
+            offset = 0
+            with open(tmp_file, 'wb') as out:
+                for result in iter_results(self.job_id, self.results_dir):
+                    if result.get('url') and seen.add(result['url']):
+                        line = (json.dumps(result, ensure_ascii=False) + "\n").encode('utf-8')
+                        out.write(line)
+                        offsets.append(offset)
+                        offset += len(line)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_file, self.log_file)
+            write_index(self.index_file, offsets)
+            self.log_size = offset
+            # Starý JSON snapshot je teď součástí logu
+            if os.path.exists(self.legacy_file):
+                os.remove(self.legacy_file)
+            self.count = len(seen)
+
+    def close(self):
+        with self.lock:
+            self.close_locked()
+
+    def close_locked(self):
+        if self.handle is not None:
+            self.sync_locked()
+            self.handle.close()
+            self.handle = None
+            self.index_handle.close()
+            self.index_handle = None
@@ -0,0 +1,263 @@
+"""Adaptivní zdvořilost vůči hostitelům - souběžnost podle odezvy, backoff, opakování a circuit breaker
+
+Každý hostitel má vlastní stav:
+- souběžnost roste o ~1 za každé "okno" úspěšných požadavků, dokud je odezva stabilní
+  (additive increase), při 429/503, timeoutu nebo 5xx se zmenší na polovinu (multiplicative decrease)
+- rozestup požadavků se při zahlcení zdvojnásobí, s úspěchy se vrací k HOST_MIN_INTERVAL
+- Retry-After zablokuje hostitele pro všechna vlákna na danou dobu
+- po HOST_BREAKER_THRESHOLD požadavcích po sobě, které selhaly i po opakování, se hostitel
+  na chvíli vypne (circuit breaker) - požadavky na něj hned selžou, po uplynutí se zkusí
+  jeden zkušební požadavek
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from metrics import CallbackMetric, Counter
+
+# Nastavení (lze přepsat proměnnými prostředí)
+HOST_MIN_CONCURRENCY = 1
+HOST_START_CONCURRENCY = int(os.environ.get('HOST_START_CONCURRENCY', 2))
+HOST_MAX_CONCURRENCY = int(os.environ.get('HOST_MAX_CONCURRENCY', 8))
+HOST_MIN_INTERVAL = float(os.environ.get('HOST_MIN_INTERVAL', 0.5))
+HOST_MAX_INTERVAL = 30.0
+# Odezva do tolikanásobku nejlepší známé se považuje za stabilní
+LATENCY_TOLERANCE = 2.0
+# Nejdelší respektovaný Retry-After (s)
+MAX_RETRY_AFTER = 300.0
+# Opakování přechodných chyb - exponenciální backoff s náhodným rozptylem
+FETCH_RETRIES = int(os.environ.get('FETCH_RETRIES', 3))
+RETRY_BASE_DELAY = float(os.environ.get('RETRY_BASE_DELAY', 1.0))
+RETRY_MAX_DELAY = 60.0
+# Circuit breaker
+HOST_BREAKER_THRESHOLD = int(os.environ.get('HOST_BREAKER_THRESHOLD', 5))
+HOST_BREAKER_COOLDOWN = float(os.environ.get('HOST_BREAKER_COOLDOWN', 60.0))
+HOST_BREAKER_MAX_COOLDOWN = 600.0
+
+# Stavy, po kterých se požadavek opakuje
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+FETCH_RETRIES_TOTAL = Counter('scraper_fetch_retries_total', 'Opakované požadavky podle důvodu', ('reason',))
+BREAKER_OPENED_TOTAL = Counter('scraper_host_breaker_opened_total', 'Kolikrát se hostitel vypnul circuit breakerem')
+
+
+class HostUnavailableError(Exception):
+    """Hostitel je vypnutý circuit breakerem - požadavek se vůbec neposlal"""
+
+
+def parse_retry_after(value):
+    """Retry-After v sekundách (číslo nebo HTTP datum), None když chybí nebo je neplatný"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def classify_error(error):
+    """Druh chyby -> (výsledek, Retry-After)
+
+    throttled = hostitel nás brzdí (429/503), error = přechodná chyba (timeout, spojení, 5xx),
+    client_error = jiná HTTP chyba (404...), fatal = chyba mimo síť (neopakuje se).
+    Useknuté nebo poškozené tělo odpovědi je přechodná chyba spojení, ne fatal.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status in THROTTLE_STATUSES:
+            return 'throttled', parse_retry_after(error.response.headers.get('Retry-After'))
+        if status in RETRY_STATUSES:
+            return 'error', None
+        return 'client_error', None
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                          requests.exceptions.ContentDecodingError)):
+        return 'error', None
+    return 'fatal', None
+
+
+def backoff_delay(attempt):
+    """Exponenciální čekání s rozptylem (polovina pevná, polovina náhodná)"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class HostState:
+    def __init__(self):
+        self.concurrency = float(HOST_START_CONCURRENCY)
+        self.interval = HOST_MIN_INTERVAL
+        self.active = 0
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.latency = None
+        self.best_latency = None
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = HOST_BREAKER_COOLDOWN
+        self.probing = False
+
+    @property
+    def limit(self):
+        return max(HOST_MIN_CONCURRENCY, int(self.concurrency))
+
+
+class HostThrottle:
+    """Řídí požadavky na hostitele napříč všemi úlohami a vlákny"""
+    def __init__(self, retries=FETCH_RETRIES):
+        self.retries = retries
+        self.cond = threading.Condition()
+        self.hosts = {}
+
+    def state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState()
+        return state
+
+    def acquire(self, host):
+        """Počká na volné místo a časový slot hostitele. Vypnutý hostitel vyhodí HostUnavailableError"""
+        with self.cond:
+            state = self.state(host)
+            while True:
+                now = time.monotonic()
+                if state.open_until:
+                    if now < state.open_until or state.probing:
+                        raise HostUnavailableError(
+                            f"Hostitel {host} je dočasně vypnutý po {state.failures} chybách, zkusí se za {max(state.open_until - now, 0):.1f} s")
+                    # Po vychladnutí projde jeden zkušební požadavek
+                    state.probing = True
+                    break
+                if state.active < state.limit and now >= state.blocked_until:
+                    break
+                self.cond.wait(timeout=max(0.05, min(state.blocked_until - now, 1.0)))
+            state.active += 1
+            slot = max(now, state.next_slot)
+            state.next_slot = slot + state.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def release(self, host, latency, outcome, retry_after=None):
+        """Upraví limity hostitele podle výsledku požadavku"""
+        with self.cond:
+            state = self.state(host)
+            state.active -= 1
+            now = time.monotonic()
+
+            if state.probing:
+                state.probing = False
+                if outcome == 'error':
+                    state.cooldown = min(state.cooldown * 2, HOST_BREAKER_MAX_COOLDOWN)
+                    state.open_until = now + state.cooldown
+                    self.cond.notify_all()
+                    return
+                state.open_until = 0.0
+                state.cooldown = HOST_BREAKER_COOLDOWN
+                state.failures = 0
+
+            if outcome == 'ok':
+                state.failures = 0
+                state.latency = latency if state.latency is None else state.latency * 0.8 + latency * 0.2
+                # Nejlepší známá odezva pomalu stárne, aby se přizpůsobila trvalé změně
+                state.best_latency = state.latency if state.best_latency is None else min(state.best_latency * 1.01, state.latency)
+                if state.latency <= state.best_latency * LATENCY_TOLERANCE:
+                    state.concurrency = min(HOST_MAX_CONCURRENCY, state.concurrency + 1 / state.concurrency)
+                    state.interval = max(HOST_MIN_INTERVAL, state.interval * 0.9)
+                else:
+                    state.concurrency = max(HOST_MIN_CONCURRENCY, state.concurrency * 0.9)
+            elif outcome == 'throttled':
+                state.failures = 0
+                state.concurrency = max(HOST_MIN_CONCURRENCY, state.concurrency / 2)
+                state.interval = min(HOST_MAX_INTERVAL, max(state.interval * 2, 0.5))
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+            elif outcome == 'error':
+                state.concurrency = max(HOST_MIN_CONCURRENCY, state.concurrency / 2)
+            elif outcome == 'client_error':
+                # Hostitel odpovídá, jen stránka neexistuje apod.
+                state.failures = 0
+            self.cond.notify_all()
+
+    def record_failure(self, host):
+        """Požadavek selhal i po všech opakováních - po HOST_BREAKER_THRESHOLD takových se hostitel vypne"""
+        with self.cond:
+            state = self.state(host)
+            state.failures += 1
+            if state.failures >= HOST_BREAKER_THRESHOLD and not state.open_until:
+                state.open_until = time.monotonic() + state.cooldown
+                BREAKER_OPENED_TOTAL.inc()
+
+    def call(self, url, func, cancel_event=None, observe=None):
+        """Zavolá func() v limitech hostitele, přechodné chyby zopakuje s backoffem
+
+        observe(fáze, sekundy) dostane čas čekání na hostitele (fáze "throttle").
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            self.acquire(host)
+            if observe:
+                observe('throttle', time.perf_counter() - started)
+
+            started = time.perf_counter()
+            try:
+                result = func()
+            except Exception as e:
+                outcome, retry_after = classify_error(e)
+                self.release(host, time.perf_counter() - started, outcome, retry_after)
+                if outcome not in ('throttled', 'error'):
+                    raise
+                if attempt >= self.retries:
+                    if outcome == 'error':
+                        self.record_failure(host)
+                    raise
+                if cancel_event is not None and cancel_event.is_set():
+                    raise
+                FETCH_RETRIES_TOTAL.inc(outcome)
+                delay = backoff_delay(attempt)
+                attempt += 1
+                # Zrušení úlohy čekání přeruší
+                if cancel_event is not None:
+                    if cancel_event.wait(delay):
+                        raise
+                else:
+                    time.sleep(delay)
+                continue
+            self.release(host, time.perf_counter() - started, 'ok')
+            return result
+
+    def stats(self):
+        """Stav hostitelů pro /hosts"""
+        now = time.monotonic()
+        with self.cond:
+            return {
+                host: {
+                    'concurrency': round(state.concurrency, 2),
+                    'active': state.active,
+                    'interval': round(state.interval, 3),
+                    'latency_ms': round(state.latency * 1000, 1) if state.latency is not None else None,
+                    'failures': state.failures,
+                    'blocked_for': round(max(state.blocked_until - now, 0), 1),
+                    'breaker_open_for': round(max(state.open_until - now, 0), 1) if state.open_until else 0
+                } for host, state in self.hosts.items()
+            }
+
+    def open_hosts(self):
+        with self.cond:
+            return sum(1 for state in self.hosts.values() if state.open_until)
+
+
+host_throttle = HostThrottle()
+
+CallbackMetric('scraper_hosts_breaker_open', 'Hostitelé aktuálně vypnutí circuit breakerem', 'gauge', (),
+               lambda: {(): host_throttle.open_hosts()})
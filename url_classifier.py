@@ -0,0 +1,93 @@
+"""Předkompilovaný klasifikátor URL - rozhoduje, zda odkaz vede na AI nástroj"""
+import re
+from functools import lru_cache
+from urllib.parse import urlparse
+
+# AI související klíčová slova pro lepší detekci
+AI_KEYWORDS = ['ai', 'artificial', 'intelligence', 'tool', 'gpt', 'chat', 'bot', 'machine', 'learning', 'neural', 'openai', 'claude', 'gemini', 'copilot', 'assistant', 'generator', 'automation', 'smart', 'auto']
+# Seznam domén k ignorování (sociální sítě, běžné weby)
+IGNORE_DOMAINS = ['facebook.com', 'twitter.com', 'linkedin.com', 'youtube.com', 'google.com', 'github.com']
+# Srovnávací weby, ze kterých scrapujeme - nejsou to samotné nástroje
+SOURCE_DOMAINS = ['futurepedia.io', 'theresanaiforthat.com', 'futuretools.io', 'producthunt.com']
+
+# Prioritní koncovky - doména je AI nástroj rovnou
+AI_EXTENSIONS = ['.ai', '.io', '.app', '.tech', '.co']
+# Běžné koncovky - AI nástroj jen s klíčovým slovem v doméně
+COMMON_EXTENSIONS = ['.com', '.org', '.net', '.dev', '.cc', '.me', '.ly']
+# Klíčová slova v cestě URL (např. obsahuje "tool", "ai")
+AI_PATH_KEYWORDS = ['tool', 'ai', 'gpt', 'chat', 'bot', 'generate', 'create']
+
+HOST_CACHE_SIZE = 65536
+
+
+def compile_any(words):
+    """Jeden regex, který najde kterékoliv ze slov kdekoliv v textu"""
+    return re.compile('|'.join(re.escape(word) for word in words))
+
+
+class AIDomainClassifier:
+    """Pravidla zkompilovaná jednou - koncovky přes množinu, klíčová slova jedním regexem"""
+    def __init__(self, ai_keywords=AI_KEYWORDS, ignore_domains=IGNORE_DOMAINS + SOURCE_DOMAINS):
+        self.ignore_re = compile_any(ignore_domains)
+        self.keyword_re = compile_any(ai_keywords)
+        self.path_keyword_re = compile_any(AI_PATH_KEYWORDS)
+        self.ai_tlds = {ext[1:] for ext in AI_EXTENSIONS}
+        self.common_tlds = {ext[1:] for ext in COMMON_EXTENSIONS}
+        # Rozhodnutí podle hostitele se cachuje, na stránce se domény opakují
+        self.classify_host = lru_cache(maxsize=HOST_CACHE_SIZE)(self.classify_host_uncached)
+
+    def classify_host_uncached(self, netloc):
+        """Rozhodne podle domény: True/False, None = rozhodne až cesta URL"""
+        domain = netloc.lower()
+
+        # Odstraň www. prefix
+        if domain.startswith('www.'):
+            domain = domain[4:]
+
+        # Ignoruj známé ne-AI domény a srovnávací weby
+        if self.ignore_re.search(domain):
+            return False
+
+        _, dot, tld = domain.rpartition('.')
+        if dot:
+            if tld in self.ai_tlds:
+                return True
+            # Pro .com, .org, .net domény - kontrola AI klíčových slov
+            if tld in self.common_tlds and self.keyword_re.search(domain):
+                return True
+        return None
+
+    def is_ai_tool(self, url):
+        """Zjistí, zda je URL AI nástroj podle domény a kontextu"""
+        try:
+            parsed = urlparse(url)
+            decision = self.classify_host(parsed.netloc)
+            if decision is not None:
+                return decision
+            # Pokud má URL suggestivní path
+            return self.path_keyword_re.search(parsed.path.lower()) is not None
+        except Exception:
+            return False
+
+    def classify_many(self, urls):
+        """Klasifikuje celý seznam URL najednou, vrací seznam True/False ve stejném pořadí"""
+        is_ai_tool = self.is_ai_tool
+        return [is_ai_tool(url) for url in urls]
+
+
+def get_main_domain(url):
+    """Vrátí hlavní doménu z URL"""
+    try:
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        return f"https://{domain}"
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_classifier(ai_keywords=tuple(AI_KEYWORDS), ignore_domains=tuple(IGNORE_DOMAINS + SOURCE_DOMAINS)):
+    """Sdílený klasifikátor pro danou sadu pravidel (cache hostitelů platí napříč úlohami)"""
+    return AIDomainClassifier(list(ai_keywords), list(ignore_domains))